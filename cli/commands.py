@@ -6,9 +6,9 @@ from rich.panel import Panel
 from typing import Optional, List
 from datetime import datetime
 
-from core.ai_engine import AIEngine
+from core.ai_engine import get_ai_engine
 from core.conversation_memory import ConversationMemory
-from services.transaction_service import TransactionService
+from services.transaction_service import get_transaction_service
 from services.document_service import DocumentService
 from services.search_service import SearchService
 from services.report_service import ReportService
@@ -45,7 +45,7 @@ def query(
     
     try:
         # Initialize AI engine to analyze the query
-        ai_engine = AIEngine()
+        ai_engine = get_ai_engine()
         
         # Obtener contexto de conversaciones previas
         conversation_context = conversation_memory.get_context_for_llm(3)
@@ -60,7 +60,7 @@ def query(
         # Process query based on intent
         if intent == 'transaction_create':
             # Create a transaction
-            transaction_service = TransactionService()
+            transaction_service = get_transaction_service()
             result = transaction_service.create_from_text(text)
             
             if result.get('success', False):
@@ -100,7 +100,7 @@ def query(
                 
                 if result.get('transaction_id'):
                     console.print("[bold]Transacción generada automáticamente:[/bold]")
-                    transaction_service = TransactionService()
+                    transaction_service = get_transaction_service()
                     transaction = transaction_service.get(result['transaction_id'])
                     if transaction:
                         _display_transaction(transaction)
@@ -492,6 +492,21 @@ def _display_document(document):
     ))
 
 
+@app.command()
+def import_transactions(
+    file: typer.FileBinaryRead = typer.Argument(..., help="Archivo JSON con una lista de transacciones")
+):
+    """
+    Importa transacciones desde un archivo JSON
+    """
+    try:
+        transactions = get_transaction_service().import_json(file.read())
+        console.print(f"[bold green]{len(transactions)} transacciones importadas[/bold green]")
+    except Exception as e:
+        logger.error(f"Error importing transactions: {e}")
+        console.print(f"[bold red]Error al importar transacciones:[/bold red] {str(e)}")
+
+
 @app.command()
 def history(
     limit: int = typer.Option(5, help="Número de interacciones a mostrar"),
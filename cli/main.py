@@ -59,7 +59,7 @@ def test_command():
         # Test search engine
         console.print("\n[yellow]Probando motor de búsqueda...[/yellow]")
         from core.search_engine import SearchEngine
-        search_engine = SearchEngine()
+        search_engine = SearchEngine(hydrate="lazy")
         results = search_engine.search_transactions("gastos de marketing", limit=2)
         console.print(f"✓ Búsqueda completada, {len(results)} resultados")
         
@@ -91,12 +91,12 @@ def setup():
     
     try:
         # Import clients
-        from data.supabase_client import SupabaseClient
-        from data.pinecone_client import PineconeClient
+        from data.supabase_client import get_supabase_client
+        from data.pinecone_client import get_pinecone_client
         
         # Setup Supabase storage buckets
         console.print("[yellow]Configurando Supabase Storage...[/yellow]")
-        supabase = SupabaseClient()
+        supabase = get_supabase_client()
         
         # Check if documents bucket exists, create if not
         try:
@@ -129,7 +129,7 @@ def setup():
         # Setup Pinecone
         console.print("[yellow]Configurando Pinecone...[/yellow]")
         try:
-            pinecone = PineconeClient()
+            pinecone = get_pinecone_client()
             pinecone.setup_index()
             
             # Verify connection
@@ -9,8 +9,8 @@ import uuid
 # Asegurarnos de que podemos importar desde nuestros módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.supabase_client import SupabaseClient
-from data.pinecone_client import PineconeClient
+from data.supabase_client import get_supabase_client
+from data.pinecone_client import get_pinecone_client
 from services.transaction_service import TransactionService
 from services.recurring_service import RecurringService
 from utils.embedding_utils import generate_embedding
@@ -21,8 +21,8 @@ def generate_test_data(num_transactions=50, num_recurring=5):
     print(f"Generating {num_transactions} test transactions and {num_recurring} recurring items...")
     
     # Initialize clients
-    supabase = SupabaseClient()
-    pinecone = PineconeClient()
+    supabase = get_supabase_client()
+    pinecone = get_pinecone_client()
     
     # Initialize services
     tx_service = TransactionService()
@@ -21,6 +21,13 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     EMBEDDING_MODEL: str = "claude-3-haiku-20240307"
     VECTOR_DIMENSION: int = 1536
+    # Cliente gRPC de Pinecone (requiere pinecone[grpc])
+    PINECONE_USE_GRPC: bool = False
+    # Guardar las transacciones en un namespace de Pinecone por tipo (income/expense)
+    PINECONE_TYPE_NAMESPACES: bool = False
+    # Corregir al vuelo fechas antiguas en los resultados de búsqueda
+    # (innecesario tras ejecutar data/migrations/fix_legacy_dates.py)
+    FIX_LEGACY_DATES: bool = False
 
     # Default Categories
     DEFAULT_INCOME_CATEGORIES: List[str] = [
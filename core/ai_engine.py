@@ -3,10 +3,27 @@ from typing import Dict, Any, List, Optional
 from anthropic import Anthropic
 from config.settings import settings
 from config.logging import logger
+from utils.cache_utils import TTLCache
 from datetime import datetime, timedelta
+import copy
+import functools
+import hashlib
 import json
 import re
 
+# Expresiones usadas por _fix_json, compiladas una sola vez
+_UNQUOTED_KEY_RE = re.compile(r'([{,]\s*)(\w+)(\s*:)')
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+# Decodificador no estricto: acepta saltos de línea dentro de cadenas
+_JSON_DECODER = json.JSONDecoder(strict=False)
+
+# Número máximo de extracciones de documentos guardadas en memoria
+DOCUMENT_CACHE_SIZE = 256
+
+# Número máximo de análisis de consultas guardados en memoria
+QUERY_CACHE_SIZE = 1024
+
 
 class AIEngine:
     def __init__(self):
@@ -14,6 +31,8 @@ class AIEngine:
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
         self.client = Anthropic(api_key=self.api_key)
         self.model = settings.EMBEDDING_MODEL
+        self._document_cache = TTLCache(maxsize=DOCUMENT_CACHE_SIZE)
+        self._query_cache = TTLCache(maxsize=QUERY_CACHE_SIZE)
 
     def process_text(
         self,
@@ -71,27 +90,16 @@ class AIEngine:
             # Use a higher temperature to avoid getting "stuck" in patterns
             response = self.process_text(text, system_prompt, temperature=0.2)
 
-            # Limpiar respuesta para asegurar JSON válido
-            response = response.strip()
-
-            # A veces Claude incluye bloques de código, eliminarlos
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-
-            response = response.strip()
-
-            # Intentar parsear JSON
+            # Intentar parsear JSON (ignorando bloques de código o texto extra)
             try:
-                data = json.loads(response)
+                data = self._parse_json_response(response)
             except json.JSONDecodeError as json_error:
                 logger.error(f"Error decodificando JSON: {json_error}")
                 logger.error(f"Respuesta del modelo: {response}")
 
                 # Intentar arreglar JSON común malformado
                 fixed_response = self._fix_json(response)
-                data = json.loads(fixed_response)
+                data = self._parse_json_response(fixed_response)
 
             # Asegurarnos de que tags sea un diccionario si está presente
             if "tags" in data and not isinstance(data["tags"], dict):
@@ -177,16 +185,24 @@ class AIEngine:
             logger.info(f"Usando datos mínimos: {minimal_data}")
             return minimal_data
 
+    def _parse_json_response(self, response: str) -> Any:
+        """Decode the first JSON object found in a model response"""
+        start = response.find("{")
+        if start == -1:
+            raise json.JSONDecodeError("No JSON object found", response, 0)
+        parsed, _ = _JSON_DECODER.raw_decode(response, start)
+        return parsed
+
     def _fix_json(self, json_str: str) -> str:
         """Try to fix common JSON errors"""
         # Reemplazar comillas simples por dobles
         json_str = json_str.replace("'", '"')
 
         # Asegurar que las claves tengan comillas dobles
-        json_str = re.sub(r'([{,]\s*)(\w+)(\s*:)', r'\1"\2"\3', json_str)
+        json_str = _UNQUOTED_KEY_RE.sub(r'\1"\2"\3', json_str)
 
         # Eliminar comas extras al final de listas u objetos
-        json_str = re.sub(r",\s*([}\]])", r"\1", json_str)
+        json_str = _TRAILING_COMMA_RE.sub(r"\1", json_str)
 
         return json_str
 
@@ -466,6 +482,15 @@ class AIEngine:
         """Extract data from a document (invoice, receipt, etc.)"""
         current_date = datetime.now()
 
+        # Reutilizar extracciones previas del mismo texto (reintentos, duplicados)
+        cache_key = (
+            hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest(),
+            document_type,
+        )
+        cached = self._document_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
         system_prompt = f"""
         You are a financial assistant that extracts information from {document_type}s.
         Today's date is {current_date.strftime('%Y-%m-%d')}.
@@ -501,27 +526,16 @@ class AIEngine:
             # Use a moderate temperature for better accuracy on structured data
             response = self.process_text(text, system_prompt, temperature=0.1)
 
-            # Limpiar respuesta para asegurar JSON válido
-            response = response.strip()
-
-            # A veces Claude incluye bloques de código, eliminarlos
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-
-            response = response.strip()
-
-            # Intentar parsear JSON
+            # Intentar parsear JSON (ignorando bloques de código o texto extra)
             try:
-                data = json.loads(response)
+                data = self._parse_json_response(response)
             except json.JSONDecodeError as json_error:
                 logger.error(f"Error decodificando JSON: {json_error}")
                 logger.error(f"Respuesta del modelo: {response}")
 
                 # Intentar arreglar JSON común malformado
                 fixed_response = self._fix_json(response)
-                data = json.loads(fixed_response)
+                data = self._parse_json_response(fixed_response)
 
             # Validar y corregir fechas
             data = self._validate_document_dates(data)
@@ -529,6 +543,8 @@ class AIEngine:
             # Validar y corregir montos
             data = self._validate_document_amounts(data)
 
+            self._document_cache.set(cache_key, copy.deepcopy(data))
+
             return data
         except Exception as e:
             logger.error(f"Error extracting document data: {e}")
@@ -679,6 +695,13 @@ class AIEngine:
         """Analyze a financial query to determine its intent and parameters"""
         current_date = datetime.now()
 
+        # Reutilizar el análisis de la misma consulta normalizada; la clave
+        # incluye el día porque el prompt lleva la fecha actual
+        cache_key = (" ".join(query.lower().split()), current_date.date())
+        cached = self._query_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
         system_prompt = f"""
         You are a financial assistant that analyzes user queries to determine their intent.
         Today's date is {current_date.strftime('%Y-%m-%d')}.
@@ -749,27 +772,13 @@ class AIEngine:
             # Use a moderate temperature for some variability while maintaining accuracy
             response = self.process_text(query, system_prompt, temperature=0.1)
 
-            # Clean the response to ensure it's valid JSON
-            response = response.strip()
-
-            # If response has multiple lines, join them (in case there are newlines in the JSON)
-            response = "".join(line.strip() for line in response.splitlines())
-
-            # Sometimes the AI might include markdown code blocks, remove them
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-
-            response = response.strip()
-
-            # Intentar parsear JSON
+            # Decode the first JSON object, skipping code fences or trailing text
             try:
-                parsed = json.loads(response)
+                parsed = self._parse_json_response(response)
             except json.JSONDecodeError:
                 fixed_response = self._fix_json(response)
                 try:
-                    parsed = json.loads(fixed_response)
+                    parsed = self._parse_json_response(fixed_response)
                 except Exception:
                     # Si todavía falla, usar un análisis por defecto
                     return {
@@ -822,6 +831,7 @@ class AIEngine:
                 parsed["parameters"]["period"] = "month"  # Valor por defecto
 
             logger.info(f"Análisis de consulta: {parsed}")
+            self._query_cache.set(cache_key, copy.deepcopy(parsed))
             return parsed
         except Exception as e:
             logger.error(f"Error analyzing financial query: {e}")
@@ -904,3 +914,9 @@ class AIEngine:
 
         # Aumentar la temperatura para respuestas más variadas y naturales
         return self.process_text(prompt, system_prompt, temperature=0.7, max_tokens=2000)
+
+
+@functools.lru_cache(maxsize=1)
+def get_ai_engine() -> AIEngine:
+    """Process-wide AIEngine, so the Anthropic client and its caches are shared"""
+    return AIEngine()
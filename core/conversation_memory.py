@@ -1,4 +1,6 @@
 from typing import List, Dict, Any, Optional
+from collections import deque
+from itertools import islice
 import json
 from datetime import datetime
 import os
@@ -8,7 +10,8 @@ class ConversationMemory:
     def __init__(self, max_history: int = 10):
         """Initialize conversation memory with maximum history length"""
         self.max_history = max_history
-        self.history = []
+        self.history: deque = deque(maxlen=max_history)
+        self._last_user_idx: Optional[int] = None
         self.session_id = datetime.now().strftime("%Y%m%d%H%M%S")
         self.memory_file = os.path.join("logs", f"conversation_{self.session_id}.json")
         
@@ -24,11 +27,17 @@ class ConversationMemory:
             "metadata": metadata or {}
         }
         
+        # El deque descarta la entrada más antigua al llegar a max_history
+        if len(self.history) == self.max_history and self._last_user_idx is not None:
+            self._last_user_idx -= 1
+            if self._last_user_idx < 0:
+                self._last_user_idx = None
+        
         self.history.append(entry)
         
-        # Limitar el tamaño de la historia
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
+        # Mantener el índice del último mensaje del usuario
+        if role == "user":
+            self._last_user_idx = len(self.history) - 1
         
         # Guardar en disco
         self._save()
@@ -41,7 +50,7 @@ class ConversationMemory:
             with open(self.memory_file, 'w', encoding='utf-8') as f:
                 json.dump({
                     "session_id": self.session_id,
-                    "history": self.history,
+                    "history": list(self.history),
                     "updated_at": datetime.now().isoformat()
                 }, f, ensure_ascii=False, indent=2)
         except Exception as e:
@@ -50,14 +59,20 @@ class ConversationMemory:
     def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get conversation history with optional limit"""
         if limit is None or limit >= len(self.history):
-            return self.history
-        return self.history[-limit:]
+            return list(self.history)
+        return list(islice(self.history, max(0, len(self.history) - limit), None))
     
     def get_last_user_query(self) -> Optional[str]:
         """Get the last user query"""
-        for entry in reversed(self.history):
-            if entry["role"] == "user":
-                return entry["content"]
+        if self._last_user_idx is None:
+            return None
+        return self.history[self._last_user_idx]["content"]
+    
+    def _find_last_user_idx(self) -> Optional[int]:
+        """Locate the index of the last user entry in the history"""
+        for idx in range(len(self.history) - 1, -1, -1):
+            if self.history[idx]["role"] == "user":
+                return idx
         return None
     
     def get_context_for_llm(self, max_entries: int = 5) -> List[Dict[str, str]]:
@@ -75,7 +90,8 @@ class ConversationMemory:
     
     def clear(self):
         """Clear conversation history"""
-        self.history = []
+        self.history.clear()
+        self._last_user_idx = None
         self._save()
     
     def load_from_file(self, file_path: str) -> bool:
@@ -86,7 +102,8 @@ class ConversationMemory:
                     data = json.load(f)
                     
                     if "history" in data and isinstance(data["history"], list):
-                        self.history = data["history"]
+                        self.history = deque(data["history"], maxlen=self.max_history)
+                        self._last_user_idx = self._find_last_user_idx()
                         self.session_id = data.get("session_id", self.session_id)
                         return True
             
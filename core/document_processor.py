@@ -1,14 +1,37 @@
 import os
-from typing import Dict, Any, Optional, BinaryIO
+import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional, BinaryIO, Tuple
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from config.logging import logger
-from utils.embedding_utils import generate_embedding
-from core.ai_engine import AIEngine
+from utils.embedding_utils import generate_embedding, generate_batch_embeddings
+from core.ai_engine import AIEngine, get_ai_engine
+
+# Patterns for the regex-level extraction of invoices and receipts
+_TOTAL_RE = re.compile(r"(?i)\btotal(?:\s+(?:due|amount|a\s+pagar))?[^\d\n]{0,12}(\d[\d.,]*)")
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_SLASH_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")
+_REFERENCE_RE = re.compile(
+    r"(?i)\b(?:invoice|factura|receipt|recibo)\s*(?:no\.?|number|n[º°o]\.?|#)\s*[:#]?\s*([A-Z0-9][A-Z0-9-]*)"
+)
+_CURRENCY_RE = re.compile(r"\b(USD|EUR|GBP|MXN|COP)\b|(€|£|US\$)")
+# Only unambiguous symbols: a bare "$" may be USD, MXN or COP
+_CURRENCY_SYMBOLS = {"€": "EUR", "£": "GBP", "US$": "USD"}
+# Currencies written without decimals: a '.' in their amounts only groups thousands
+_NO_DECIMAL_CURRENCIES = {"COP"}
+_ISSUER_RE = re.compile(
+    r"(?im)^[ \t]*(?:from|issuer|issued by|vendor|seller|merchant|billed by|"
+    r"emisor|emitido por|proveedor|vendedor)[ \t]*:[ \t]*(\S.*?)[ \t]*$"
+)
+
+# Extraction is I/O bound (OCR and LLM calls), so several files run at once
+_extract_pool = ThreadPoolExecutor(max_workers=4)
 
 class DocumentProcessor:
     def __init__(self, ai_engine: Optional[AIEngine] = None):
         """Initialize the document processor"""
-        self.ai_engine = ai_engine or AIEngine()
+        self.ai_engine = ai_engine or get_ai_engine()
     
     def extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from a PDF file"""
@@ -42,6 +65,36 @@ class DocumentProcessor:
     
     def process_document(self, file_obj: BinaryIO, filename: str) -> Dict[str, Any]:
         """Process a document file and extract information"""
+        result = self._extract_document(file_obj, filename)
+        
+        if result.get("success", False):
+            # Generate embedding for the document
+            result["embedding"] = generate_embedding(result["content_text"])
+        
+        return result
+    
+    def process_documents(self, files: List[Tuple[BinaryIO, str]]) -> List[Dict[str, Any]]:
+        """
+        Process several document files, generating their embeddings in a single batch
+        
+        Args:
+            files: List of (file_obj, filename) tuples
+            
+        Returns:
+            List of results in the same order as the input files
+        """
+        results = list(_extract_pool.map(lambda file: self._extract_document(*file), files))
+        
+        successful = [result for result in results if result.get("success", False)]
+        if successful:
+            embeddings = generate_batch_embeddings([result["content_text"] for result in successful])
+            for result, embedding in zip(successful, embeddings):
+                result["embedding"] = embedding
+        
+        return results
+    
+    def _extract_document(self, file_obj: BinaryIO, filename: str) -> Dict[str, Any]:
+        """Extract text and structured data from a document file (without embedding)"""
         try:
             # Save file to temporary location
             temp_dir = tempfile.mkdtemp()
@@ -74,19 +127,17 @@ class DocumentProcessor:
             # Determine document type based on content
             doc_type = self.determine_document_type(text)
             
-            # Extract structured data using AI
-            extracted_data = self.ai_engine.extract_document_data(text, doc_type)
-            
-            # Generate embedding for the document
-            embedding = generate_embedding(text)
+            # Try a cheap regex pass first and only use the AI when it is not enough
+            extracted_data = self._regex_extract(text, doc_type)
+            if extracted_data is None:
+                extracted_data = self.ai_engine.extract_document_data(text, doc_type)
             
             return {
                 "success": True,
                 "file_name": filename,
                 "content_text": text,
                 "document_type": doc_type,
-                "extracted_data": extracted_data,
-                "embedding": embedding
+                "extracted_data": extracted_data
             }
         except Exception as e:
             logger.error(f"Error processing document: {e}")
@@ -95,6 +146,112 @@ class DocumentProcessor:
                 "error": str(e)
             }
     
+    def _regex_extract(self, text: str, doc_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Extract the regular fields of invoices and receipts with regular expressions
+        
+        The issuer, total, date and currency must all be found explicitly in
+        the text (the issuer drives the transaction description and category);
+        otherwise the document goes to the LLM.
+        
+        Returns:
+            The extracted data, or None if a required field is missing or ambiguous
+        """
+        if doc_type not in ("invoice", "receipt"):
+            return None
+        
+        data: Dict[str, Any] = {}
+        
+        # Never assume a currency here: without one in the text the LLM decides
+        currency_match = _CURRENCY_RE.search(text)
+        if currency_match:
+            data["currency"] = currency_match.group(1) or _CURRENCY_SYMBOLS[currency_match.group(2)]
+        
+        # Use the last "total" in the document (line items and subtotals come first)
+        totals = _TOTAL_RE.findall(text)
+        if totals:
+            amount = self._parse_amount(totals[-1], data.get("currency"))
+            if amount:
+                data["total_amount"] = amount
+        
+        date_str = self._find_date(text)
+        if date_str:
+            data["date"] = date_str
+        
+        issuer_match = _ISSUER_RE.search(text)
+        if issuer_match:
+            data["issuer"] = issuer_match.group(1)
+        
+        if not all(field in data for field in ("total_amount", "date", "issuer", "currency")):
+            return None
+        
+        reference_match = _REFERENCE_RE.search(text)
+        if reference_match:
+            data["reference_number"] = reference_match.group(1)
+        
+        data["type"] = doc_type
+        logger.info(f"Datos del documento extraídos con expresiones regulares: {data}")
+        return data
+    
+    def _parse_amount(self, value: str, currency: Optional[str] = None) -> Optional[float]:
+        """
+        Parse an amount written with either '.' or ',' as decimal separator
+        
+        With a single kind of separator, groups of three digits are thousands
+        (150.000, 1,500) and one or two final digits are decimals (45.20),
+        except for currencies without decimals. Anything else is ambiguous
+        and returns None so the LLM reads the amount.
+        """
+        value = value.rstrip(".,")
+        if "," in value and "." in value:
+            # The last separator is the decimal one
+            if value.rfind(",") > value.rfind("."):
+                value = value.replace(".", "").replace(",", ".")
+            else:
+                value = value.replace(",", "")
+        elif "," in value or "." in value:
+            separator = "," if "," in value else "."
+            integer, *groups = value.split(separator)
+            if all(len(group) == 3 for group in groups):
+                value = value.replace(separator, "")
+            elif len(groups) == 1 and len(groups[0]) <= 2 and currency not in _NO_DECIMAL_CURRENCIES:
+                value = f"{integer}.{groups[0]}"
+            else:
+                return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    
+    def _find_date(self, text: str) -> Optional[str]:
+        """
+        Find the first valid ISO (YYYY-MM-DD) or slash-separated date in the text
+        
+        A slash date is read as DD/MM/YYYY or MM/DD/YYYY only when one of its
+        parts is greater than 12; if the first date is ambiguous (03/04/2025)
+        None is returned so the LLM decides.
+        """
+        candidates = [(m.start(), m.group(1), m.group(2), m.group(3)) for m in _ISO_DATE_RE.finditer(text)]
+        for m in _SLASH_DATE_RE.finditer(text):
+            first, second, year = m.groups()
+            if int(first) > 12:
+                candidates.append((m.start(), year, second, first))
+            elif int(second) > 12:
+                candidates.append((m.start(), year, first, second))
+            elif first.lstrip("0") == second.lstrip("0"):
+                candidates.append((m.start(), year, first, second))
+            else:
+                candidates.append((m.start(), None, None, None))
+        
+        for _, year, month, day in sorted(candidates, key=lambda candidate: candidate[0]):
+            if year is None:
+                return None
+            try:
+                return datetime(int(year), int(month), int(day)).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        return None
+    
     def determine_document_type(self, text: str) -> str:
         """Determine the type of document based on its content"""
         # Simple heuristic for document type determination
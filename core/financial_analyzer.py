@@ -1,14 +1,13 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
-import numpy as np
 import pandas as pd
-from data.supabase_client import SupabaseClient
+from data.supabase_client import get_supabase_client
 from config.logging import logger
 
 class FinancialAnalyzer:
     def __init__(self):
         """Initialize the financial analyzer"""
-        self.supabase = SupabaseClient()
+        self.supabase = get_supabase_client()
     
     def calculate_runway(self, 
                         months_back: int = 3, 
@@ -24,16 +23,13 @@ class FinancialAnalyzer:
             Dictionary with runway analysis
         """
         try:
-            # Get transactions for burn rate calculation
+            # Get monthly totals for burn rate calculation
             end_date = datetime.now()
             start_date = end_date - timedelta(days=30 * months_back)
             
-            transactions = self.supabase.list_transactions(
-                limit=1000,
-                date_range=[start_date.isoformat(), end_date.isoformat()]
-            )
+            totals = self.supabase.monthly_transaction_totals(start_date, end_date)
             
-            if not transactions:
+            if not totals:
                 # No data yet, return a friendly message
                 return {
                     'message': 'No hay suficientes datos de transacciones para calcular el runway.',
@@ -45,44 +41,36 @@ class FinancialAnalyzer:
                     'error': "No transaction data available for runway calculation"
                 }
             
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame([t.model_dump() for t in transactions])
-            
             # Calculate monthly burn rate
-            df['month'] = pd.to_datetime(df['date']).dt.to_period('M')
-            
-            monthly_data = []
-            for month, group in df.groupby('month'):
-                income = group[group['type'] == 'income']['amount'].sum()
-                expenses = group[group['type'] == 'expense']['amount'].sum()
-                net = income - expenses
-                burn_rate = expenses - income if expenses > income else 0
-                
-                monthly_data.append({
-                    'month': month.strftime('%Y-%m'),
-                    'income': float(income),
-                    'expenses': float(expenses),
-                    'net': float(net),
-                    'burn_rate': float(burn_rate)
-                })
+            monthly = self._monthly_totals(totals)
+            burn_rate = (monthly['expenses'] - monthly['income']).clip(lower=0)
+            
+            # Convert to Python values only at the output boundary
+            monthly_data = [
+                {
+                    'month': month,
+                    'income': income,
+                    'expenses': expenses,
+                    'net': net,
+                    'burn_rate': burn
+                }
+                for month, income, expenses, net, burn in zip(
+                    monthly.index.tolist(),
+                    monthly['income'].tolist(),
+                    monthly['expenses'].tolist(),
+                    monthly['net'].tolist(),
+                    burn_rate.tolist()
+                )
+            ]
             
             # Calculate average monthly burn rate
-            if monthly_data:
-                avg_burn_rate = np.mean([m['burn_rate'] for m in monthly_data])
-            else:
-                avg_burn_rate = 0
+            avg_burn_rate = float(burn_rate.mean()) if len(burn_rate) else 0
             
             # Calculate or use provided cash balance
             if cash_balance is None:
-                # Calculate from all historical data
-                all_transactions = self.supabase.list_transactions(limit=10000)
-                if all_transactions:
-                    df_all = pd.DataFrame([t.model_dump() for t in all_transactions])
-                    total_income = df_all[df_all['type'] == 'income']['amount'].sum()
-                    total_expenses = df_all[df_all['type'] == 'expense']['amount'].sum()
-                    cash_balance = float(total_income - total_expenses)
-                else:
-                    cash_balance = 0
+                # Calculate from all historical data (aggregated in the database)
+                totals = self.supabase.sum_by_type()
+                cash_balance = float(totals.get('income', 0) - totals.get('expense', 0))
             
             # Calculate runway in months
             runway_months = 0
@@ -129,38 +117,43 @@ class FinancialAnalyzer:
             if period_start is None:
                 period_start = period_end - timedelta(days=90)
             
-            filters = {
-                "date_range": [period_start.isoformat(), period_end.isoformat()],
-                "type": transaction_type
-            }
-            
-            transactions = self.supabase.list_transactions(limit=1000, **filters)
+            # Totals per category of this type, aggregated in the database
+            totals = [
+                row for row in self.supabase.transaction_totals(period_start, period_end)
+                if row['type'] == transaction_type
+            ]
             
-            if not transactions:
+            if not totals:
                 return {
                     "error": f"No {transaction_type} data available for the selected period",
                     "message": f"No hay datos de {transaction_type} disponibles para el período seleccionado.",
                     "suggestion": "Intenta agregar algunas transacciones primero o selecciona un período diferente."
                 }
             
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame([t.model_dump() for t in transactions])
-            
-            # Group by category
-            category_totals = df.groupby('category')['amount'].sum().sort_values(ascending=False)
+            # One total per category
+            category_totals = pd.Series(
+                [float(row['total']) for row in totals],
+                index=[row['category'] for row in totals],
+                dtype='float64'
+            ).sort_values(ascending=False)
             
             # Calculate percentage of total
             total_amount = category_totals.sum()
             category_percentages = (category_totals / total_amount * 100).round(1)
             
             # Format results
-            categories = []
-            for category, amount in category_totals.items():
-                categories.append({
+            categories = [
+                {
                     'category': category,
-                    'amount': float(amount),
-                    'percentage': float(category_percentages[category])
-                })
+                    'amount': amount,
+                    'percentage': percentage
+                }
+                for category, amount, percentage in zip(
+                    category_totals.index.tolist(),
+                    category_totals.tolist(),
+                    category_percentages.tolist()
+                )
+            ]
             
             result = {
                 'type': transaction_type,
@@ -239,52 +232,44 @@ class FinancialAnalyzer:
             
             start_date = end_date.replace(day=1) - timedelta(days=30 * months_back)
             
-            transactions = self.supabase.list_transactions(
-                limit=10000,
-                date_range=[start_date.isoformat(), end_date.isoformat()]
-            )
+            totals = self.supabase.monthly_transaction_totals(start_date, end_date)
             
-            if not transactions:
+            if not totals:
                 return {
                     "error": "No transaction data available for monthly comparison",
                     "message": "No hay datos de transacciones disponibles para la comparación mensual.",
                     "suggestion": "Intenta agregar algunas transacciones primero para poder realizar un análisis mensual."
                 }
             
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame([t.model_dump() for t in transactions])
-            df['date'] = pd.to_datetime(df['date'])
-            df['month'] = df['date'].dt.to_period('M')
-            
-            # Group by month and transaction type
-            monthly_data = []
-            
-            for month, month_group in df.groupby('month'):
-                income = month_group[month_group['type'] == 'income']['amount'].sum()
-                expenses = month_group[month_group['type'] == 'expense']['amount'].sum()
-                net = income - expenses
-                
-                monthly_data.append({
-                    'month': month.strftime('%Y-%m'),
-                    'income': float(income),
-                    'expenses': float(expenses),
-                    'net': float(net)
-                })
-            
-            # Calculate month-over-month changes
-            for i in range(1, len(monthly_data)):
-                curr = monthly_data[i]
-                prev = monthly_data[i-1]
-                
-                curr['income_change'] = ((curr['income'] - prev['income']) / prev['income'] * 100) if prev['income'] else 0
-                curr['expenses_change'] = ((curr['expenses'] - prev['expenses']) / prev['expenses'] * 100) if prev['expenses'] else 0
-                curr['net_change'] = ((curr['net'] - prev['net']) / abs(prev['net']) * 100) if prev['net'] else 0
-            
-            # The first month won't have change data
-            if monthly_data:
-                monthly_data[0]['income_change'] = 0
-                monthly_data[0]['expenses_change'] = 0
-                monthly_data[0]['net_change'] = 0
+            # Income and expenses per month
+            monthly = self._monthly_totals(totals)
+            
+            # Calculate month-over-month changes (the first month has no change data)
+            prev = monthly.shift(1)
+            income_change = self._percent_change(monthly['income'], prev['income'])
+            expenses_change = self._percent_change(monthly['expenses'], prev['expenses'])
+            net_change = self._percent_change(monthly['net'], prev['net'], prev['net'].abs())
+            
+            monthly_data = [
+                {
+                    'month': month,
+                    'income': income,
+                    'expenses': expenses,
+                    'net': net,
+                    'income_change': inc_change,
+                    'expenses_change': exp_change,
+                    'net_change': n_change
+                }
+                for month, income, expenses, net, inc_change, exp_change, n_change in zip(
+                    monthly.index.tolist(),
+                    monthly['income'].tolist(),
+                    monthly['expenses'].tolist(),
+                    monthly['net'].tolist(),
+                    income_change.tolist(),
+                    expenses_change.tolist(),
+                    net_change.tolist()
+                )
+            ]
             
             result = {
                 'period_start': start_date.isoformat(),
@@ -297,4 +282,25 @@ class FinancialAnalyzer:
         
         except Exception as e:
             logger.error(f"Error performing monthly comparison: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
+    
+    def _monthly_totals(self, totals: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Income, expenses and net per month from monthly_transaction_totals rows
+        
+        The index holds the 'YYYY-MM' month keys, in chronological order.
+        """
+        monthly = pd.DataFrame(totals).astype({'total': 'float64'}).pivot_table(
+            index='month', columns='type', values='total', aggfunc='sum', fill_value=0.0
+        ).reindex(columns=['income', 'expense'], fill_value=0.0).sort_index()
+        monthly.columns = ['income', 'expenses']
+        monthly['net'] = monthly['income'] - monthly['expenses']
+        return monthly.astype('float64')
+    
+    def _percent_change(self, current: pd.Series, previous: pd.Series,
+                        base: Optional[pd.Series] = None) -> pd.Series:
+        """Percentage change vs. the previous month, 0 where there is no previous value"""
+        if base is None:
+            base = previous
+        change = (current - previous) / base * 100
+        return change.where(previous.fillna(0) != 0, 0.0).fillna(0.0)
\ No newline at end of file
@@ -1,22 +1,312 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import json
+import re
 import numpy as np
 from datetime import datetime, timedelta
-from utils.embedding_utils import generate_embedding, calculate_similarity
-from data.supabase_client import SupabaseClient
-from data.pinecone_client import PineconeClient
+from utils.embedding_utils import generate_embedding, generate_batch_embeddings
+from utils.cache_utils import TTLCache
+from pydantic import TypeAdapter
+from data.models import Transaction, SearchIndex, TransactionType
+from data.supabase_client import get_supabase_client
+from data.pinecone_client import get_pinecone_client
+from config.settings import settings
 from config.logging import logger
 
+# Campos de transacción que TransactionService guarda como metadatos en Pinecone;
+# en modo "lazy" basta con ellos y no se consulta Supabase
+TRANSACTION_METADATA_FIELDS = frozenset({
+    "type", "amount", "currency", "category", "date", "description"
+})
+
+def _keyword_re(keywords) -> "re.Pattern":
+    """
+    Single alternation matching any keyword at the start of a word (longest first)
+    
+    The patterns are matched against the lowercased query.
+    """
+    alternatives = sorted((k.lower() for k in keywords), key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(map(re.escape, alternatives)) + r")")
+
+# Palabras clave de la consulta -> categoría
+_CATEGORY_KEYWORDS = {
+    "software": "Software",
+    "nómina": "Payroll", "payroll": "Payroll",
+    "marketing": "Marketing",
+    "oficina": "Office", "office": "Office",
+    "servicios": "Services", "services": "Services",
+    "hardware": "Hardware",
+    "viajes": "Travel", "travel": "Travel",
+    "legal": "Legal",
+    "impuestos": "Taxes", "taxes": "Taxes",
+    "ingresos": "Revenue", "revenue": "Revenue",
+    "ventas": "Revenue", "sales": "Revenue",
+    "alquiler": "Rent", "rent": "Rent"
+}
+_CATEGORY_RE = _keyword_re(_CATEGORY_KEYWORDS)
+
+# Categorías que se buscan directamente por su nombre en _try_exact_match
+_EXACT_CATEGORIES = {c.lower(): c for c in [
+    "Software", "Payroll", "Marketing", "Office", "Services",
+    "Hardware", "Travel", "Legal", "Taxes", "Revenue", "Rent"
+]}
+
+# Palabras (completas) que activan la búsqueda exacta por tipo
+_INCOME_TOKENS = frozenset({"ingreso", "ingresos", "income", "incomes"})
+_EXPENSE_TOKENS = frozenset({"gasto", "gastos", "expense", "expenses"})
+_WORD_RE = re.compile(r"\w+")
+
+# Tipo de transacción (los plurales coinciden por prefijo)
+_INCOME_RE = _keyword_re(["ingreso", "income"])
+_EXPENSE_RE = _keyword_re(["gasto", "expense"])
+
+# Periodos relativos, en orden de prioridad
+_RELATIVE_PERIOD_KEYWORDS = [
+    ("last_month", ["último mes", "mes pasado", "last month"]),
+    ("this_month", ["este mes", "mes actual", "this month"]),
+    ("this_year", ["este año", "año actual", "this year"]),
+    ("last_year", ["año pasado", "last year"]),
+]
+_RELATIVE_PERIODS = [(name, _keyword_re(keywords)) for name, keywords in _RELATIVE_PERIOD_KEYWORDS]
+
+_MONTHS = {
+    "enero": 1, "january": 1,
+    "febrero": 2, "february": 2,
+    "marzo": 3, "march": 3,
+    "abril": 4, "april": 4,
+    "mayo": 5, "may": 5,
+    "junio": 6, "june": 6,
+    "julio": 7, "july": 7,
+    "agosto": 8, "august": 8,
+    "septiembre": 9, "september": 9,
+    "octubre": 10, "october": 10,
+    "noviembre": 11, "november": 11,
+    "diciembre": 12, "december": 12
+}
+_MONTH_RE = _keyword_re(_MONTHS)
+_YEAR_RE = re.compile(r"\d{4}")
+
+# Cualquier expresión temporal: descarta en una sola búsqueda las consultas sin fechas
+_TEMPORAL_RE = _keyword_re(
+    [keyword for _, keywords in _RELATIVE_PERIOD_KEYWORDS for keyword in keywords] + list(_MONTHS)
+)
+
+@functools.lru_cache(maxsize=64)
+def _month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """First and last day of a month"""
+    next_month = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return datetime(year, month, 1), next_month - timedelta(days=1)
+
+# Serializadores de listas de modelos (equivalen a model_dump() elemento a elemento)
+_TX_LIST_ADAPTER = TypeAdapter(List[Transaction])
+_INDEX_LIST_ADAPTER = TypeAdapter(List[SearchIndex])
+
+# Pool para consultas de E/S a Supabase que no se pueden agrupar
+_io_pool = ThreadPoolExecutor(max_workers=8)
+
+# Embeddings de consultas ya calculadas (el embedding es determinista por texto)
+_query_embedding_cache = TTLCache(maxsize=2048)
+
+def _normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different queries share one embedding"""
+    return " ".join(query.split())
+
+def _embed_query(query: str) -> List[float]:
+    """Generate the embedding for a search query, reusing cached results"""
+    key = _normalize_query(query)
+    cached = _query_embedding_cache.get(key)
+    if cached is None:
+        cached = tuple(generate_embedding(key))
+        _query_embedding_cache.set(key, cached)
+    return list(cached)
+
+def _embed_queries(queries: List[str]) -> List[List[float]]:
+    """Embed several queries, generating only the ones not cached in a single batch"""
+    keys = [_normalize_query(q) for q in queries]
+    embeddings = {key: _query_embedding_cache.get(key) for key in keys}
+    
+    missing = [key for key, cached in embeddings.items() if cached is None]
+    if missing:
+        for key, embedding in zip(missing, generate_batch_embeddings(missing)):
+            embeddings[key] = tuple(embedding)
+            _query_embedding_cache.set(key, embeddings[key])
+    
+    return [list(embeddings[key]) for key in keys]
+
+def _as_date_str(value: Any) -> Optional[str]:
+    """Date part (YYYY-MM-DD) of an ISO string or datetime"""
+    if value is None:
+        return None
+    if type(value) is str:
+        return value[:10] if 'T' in value else value
+    return value.strftime('%Y-%m-%d')
+
+def _iso(value: Any) -> Any:
+    """Return datetimes as ISO strings, leaving other values untouched"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _date_range_clause(value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Build the Pinecone date clause for a [start, end] pair"""
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        return "date", {"$gte": _iso(value[0]), "$lte": _iso(value[1])}
+    return None
+
+# Traducción de cada filtro de búsqueda a su cláusula de metadatos en Pinecone
+# Las cláusulas de un mismo campo (p. ej. los dos límites de "amount") se combinan
+_FILTER_BUILDERS: Dict[str, Callable[[Any], Optional[Tuple[str, Dict[str, Any]]]]] = {
+    "type": lambda value: ("type", {"$eq": value}),
+    "category": lambda value: ("category", {"$eq": value}),
+    "min_amount": lambda value: ("amount", {"$gte": value}),
+    "max_amount": lambda value: ("amount", {"$lte": value}),
+    "date_range": _date_range_clause,
+}
+
+def _translate_filters(items) -> Dict[str, Any]:
+    """Build the Pinecone metadata filter from (key, value) pairs"""
+    filter_dict: Dict[str, Any] = {}
+    for key, value in items:
+        builder = _FILTER_BUILDERS.get(key)
+        clause = builder(value) if builder else None
+        if clause is not None:
+            field, condition = clause
+            filter_dict.setdefault(field, {}).update(condition)
+    return filter_dict
+
+# Los mismos filtros se repiten entre peticiones: se traducen una sola vez
+_translate_filters_cached = functools.lru_cache(maxsize=256)(_translate_filters)
+
 class SearchEngine:
-    def __init__(self):
-        """Initialize the search engine"""
-        self.supabase = SupabaseClient()
-        self.pinecone = PineconeClient()
+    # Resultados ya hidratados, compartidos por todas las instancias para poder invalidarlos
+    _result_cache = TTLCache(maxsize=256, ttl=300)
+    # Respuestas completas por texto de consulta: las llamadas repetidas de un agente
+    # no vuelven a generar el embedding ni a consultar Supabase
+    _response_cache = TTLCache(maxsize=512, ttl=60)
+
+    def __init__(self, hydrate: str = "full",
+                 projection: Optional[set] = None):
+        """
+        Initialize the search engine
+        
+        Args:
+            hydrate: How transaction hits are built
+                - 'full' (default): always fetch the complete rows from Supabase
+                - 'lazy': from the Pinecone metadata (TRANSACTION_METADATA_FIELDS),
+                  fetching from Supabase only the hits whose metadata lacks a requested field;
+                  for callers that don't need payment_date, tags, document_id or metadata
+            projection: Fields to include in the results ("id" is always included);
+                None returns every field
+        """
+        if hydrate not in ("lazy", "full"):
+            raise ValueError(f"Modo de hidratación no válido: {hydrate}")
+        self._hydrate = hydrate
+        self.supabase = get_supabase_client()
+        self.pinecone = get_pinecone_client()
+        # Campos a incluir en los resultados (None = todos los campos del modelo);
+        # forma parte de la clave de las cachés de resultados (_result_shape)
+        self._projection: Optional[frozenset] = frozenset(projection) if projection else None
+    
+    def _to_result_dict(self, model: Any, similarity: Optional[float] = None) -> Dict[str, Any]:
+        """Serialize a search hit with the configured field projection and its score"""
+        include = self._projection | {"id"} if self._projection else None
+        # Equivale a model_dump() llamando directamente al serializador compilado del modelo
+        result = type(model).__pydantic_serializer__.to_python(model, include=include)
+        if similarity is not None:
+            result["similarity"] = similarity
+        return result
+    
+    def _metadata_covers(self, metadata: Optional[Dict[str, Any]]) -> bool:
+        """Whether a transaction hit can be built from its Pinecone metadata alone"""
+        if self._hydrate != "lazy" or not metadata:
+            return False
+        required = (self._projection or TRANSACTION_METADATA_FIELDS) - {"id", "similarity"}
+        return required <= metadata.keys()
+    
+    def _metadata_to_dict(self, match: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a transaction hit from the Pinecone match metadata"""
+        metadata = match["metadata"]
+        fields = self._projection or TRANSACTION_METADATA_FIELDS
+        result = {field: metadata[field] for field in fields if field in metadata}
+        result["id"] = match["id"]
+        result["similarity"] = match["score"]
+        return result
+    
+    def hydrate(self, ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetch the complete transactions for the given IDs from Supabase
+        
+        For callers of lazy searches that need fields not stored in Pinecone.
+        
+        Returns:
+            Dictionary mapping the string ID to its Transaction
+        """
+        if not ids:
+            return {}
+        return self._fetch_by_ids(ids, self.supabase.get_transactions_by_ids, self.supabase.get_transaction)
+    
+    def _transaction_hits(self, matches: List[Dict[str, Any]],
+                          found: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convert Pinecone matches to transaction dicts, keeping the ranking order"""
+        transactions = []
+        for match in matches:
+            transaction = found.get(match["id"])
+            if transaction:
+                transaction_dict = self._to_result_dict(transaction, match["score"])
+            elif self._metadata_covers(match.get("metadata")):
+                transaction_dict = self._metadata_to_dict(match)
+            else:
+                continue
+            transactions.append(transaction_dict)
+        
+        # Corregir fechas antiguas (años anteriores a 2024)
+        self._fix_dates_batch(transactions)
+        return transactions
+    
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop cached search results (call after writing transactions or documents)"""
+        cls._result_cache.invalidate()
+        cls._response_cache.invalidate()
+    
+    def _fetch_by_ids(self, ids: List[str],
+                      bulk_fetch: Callable[[List[str]], List[Any]],
+                      single_fetch: Callable[[str], Any]) -> Dict[str, Any]:
+        """
+        Fetch records by ID, mapped by their string ID
+        
+        Uses a single bulk request; if that fails, issues the individual
+        requests concurrently instead of one after another.
+        """
+        try:
+            records = bulk_fetch(ids)
+        except Exception as e:
+            logger.warning(f"Consulta agrupada fallida, consultando por ID en paralelo: {e}")
+            records = [r for r in _io_pool.map(single_fetch, ids) if r]
+        return {str(r.id): r for r in records}
+    
+    def _result_cache_key(self, reference_type: str, query_embedding: List[float],
+                          filter_dict: Optional[Dict[str, Any]], limit: int) -> tuple:
+        """Build the result cache key for a vector search"""
+        embedding_digest = hashlib.blake2b(
+            np.asarray(query_embedding, dtype=np.float32).tobytes(), digest_size=16
+        ).digest()
+        filter_key = json.dumps(filter_dict or {}, sort_keys=True, default=str)
+        return (reference_type, embedding_digest, filter_key, limit, self._result_shape())
+    
+    def _result_shape(self) -> tuple:
+        """El formato de los resultados depende del modo de hidratación y de la proyección"""
+        return (self._hydrate, tuple(sorted(self._projection or ())))
     
     def search_transactions(self, query: str, limit: int = 5, 
                            filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search for transactions using semantic search
         
+        Identical calls within a minute are answered from a response cache.
+        
         Args:
             query: The search query
             limit: Maximum number of results to return
@@ -25,11 +315,37 @@ class SearchEngine:
         Returns:
             List of matching transactions
         """
+        cache_key = (
+            _normalize_query(query or ""), limit,
+            json.dumps(filters or {}, sort_keys=True, default=str), self._result_shape()
+        )
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Respuesta obtenida de la caché ({len(cached)} transacciones)")
+            return [dict(t) for t in cached]
+        
+        transactions = self._search_transactions(query, limit, filters)
+        # No guardar respuestas vacías: pueden deberse a un error transitorio
+        if transactions:
+            self._response_cache.set(cache_key, [dict(t) for t in transactions])
+        return transactions
+    
+    def _search_transactions(self, query: str, limit: int,
+                             filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Uncached body of search_transactions"""
         try:
+            # Consulta vacía: no hay nada que embeber, devolver las transacciones recientes
+            if not query or not query.strip():
+                logger.info("Consulta vacía, devolviendo transacciones recientes")
+                return self._to_fixed_dicts(
+                    self.supabase.list_transactions(limit=limit, **(filters or {}))
+                )
+            
             logger.info(f"Buscando transacciones para la consulta: '{query}'")
             
             # Analizar la consulta para extraer información temporal
-            temporal_info = self._extract_temporal_info(query)
+            query_lower = query.lower()
+            temporal_info = self._extract_temporal_info(query, query_lower)
             
             # Si hay filtros explícitos, usarlos
             if not filters:
@@ -41,98 +357,98 @@ class SearchEngine:
                 logger.info(f"Filtro temporal detectado: {temporal_info[0]} a {temporal_info[1]}")
             
             # Extraer posibles categorías o tipos de la consulta
-            category_type_filters = self._extract_category_type_filters(query)
+            category_type_filters = self._extract_category_type_filters(query, query_lower)
             if category_type_filters:
                 filters.update(category_type_filters)
             
-            # Considerar primero búsqueda exacta para categorías y tipos específicos
-            exact_matches = self._try_exact_match(query)
+            # Considerar primero búsqueda exacta para categorías y tipos específicos;
+            # la consulta a Supabase se lanza en segundo plano mientras se genera el embedding
+            exact_future = _io_pool.submit(self._try_exact_match, query, query_lower)
+            
+            # Generar embedding para la consulta
+            query_embedding = _embed_query(query)
+            
+            exact_matches = exact_future.result()
             if exact_matches:
                 logger.info(f"Encontradas {len(exact_matches)} coincidencias exactas")
                 return exact_matches[:limit]
             
-            # Generar embedding para la consulta
-            query_embedding = generate_embedding(query)
-            
             # Construir filtros para Pinecone
-            filter_dict = {}
-            if filters:
-                # Convertir filtros a formato Pinecone
-                for key, value in filters.items():
-                    if key == "type":
-                        filter_dict["type"] = {"$eq": value}
-                    elif key == "category":
-                        filter_dict["category"] = {"$eq": value}
-                    elif key == "min_amount":
-                        filter_dict["amount"] = {"$gte": value}
-                    elif key == "max_amount":
-                        if "amount" not in filter_dict:
-                            filter_dict["amount"] = {}
-                        filter_dict["amount"]["$lte"] = value
-                    elif key == "date_range" and isinstance(value, list) and len(value) == 2:
-                        # Convertir fechas a strings ISO si son objetos datetime
-                        start_date = value[0].isoformat() if isinstance(value[0], datetime) else value[0]
-                        end_date = value[1].isoformat() if isinstance(value[1], datetime) else value[1]
-                        
-                        filter_dict["date"] = {
-                            "$gte": start_date,
-                            "$lte": end_date
-                        }
+            filter_dict = self._build_filter_dict(filters)
+            
+            # Reutilizar resultados recientes de la misma búsqueda
+            cache_key = self._result_cache_key("transaction", query_embedding, filter_dict, limit)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Resultados obtenidos de la caché de búsqueda ({len(cached)} transacciones)")
+                return [dict(t) for t in cached]
+            
+            # Lanzar la búsqueda de texto en paralelo con Pinecone: si la búsqueda vectorial
+            # devuelve pocos resultados, el respaldo ya está en camino (si no, se descarta).
+            # Lleva los mismos filtros que la consulta vectorial
+            text_future = _io_pool.submit(self.supabase.search_text, query, "transaction", limit, **filters)
             
             # Buscar en Pinecone
             try:
-                results = self.pinecone.query_vector(
-                    vector=query_embedding,
-                    filter=filter_dict if filter_dict else None,
-                    top_k=limit,
-                    include_metadata=True
-                )
+                results = self._query_transactions(query_embedding, filters, filter_dict, limit)
                 
                 # Convertir resultados a lista de transacciones
                 transactions = []
+                matches = []
                 
                 # Verificar si tenemos coincidencias
                 if "matches" in results and results["matches"]:
-                    for match in results["matches"]:
-                        # Obtener transacción completa de Supabase
-                        transaction_id = match["id"]
-                        transaction = self.supabase.get_transaction(transaction_id)
-                        
-                        if transaction:
-                            # Añadir puntuación de similitud a la transacción
-                            transaction_dict = transaction.model_dump()
-                            
-                            # Corregir fechas antiguas (años anteriores a 2024)
-                            self._fix_transaction_dates(transaction_dict)
-                            
-                            transaction_dict["similarity"] = match["score"]
-                            transactions.append(transaction_dict)
+                    # Consultar en Supabase (en una sola petición) solo lo que no cubren los metadatos
+                    matches = results["matches"]
+                    found = self.hydrate(
+                        [m["id"] for m in matches if not self._metadata_covers(m.get("metadata"))]
+                    )
+                    transactions = self._transaction_hits(matches, found)
                 
                 # Si no hay resultados suficientes, intentar con texto
                 if len(transactions) < limit:
                     logger.info(f"Búsqueda vectorial devolvió pocos resultados ({len(transactions)}), probando búsqueda de texto")
-                    text_results = self.text_search(query, "transaction", limit - len(transactions))
+                    try:
+                        text_results = text_future.result()
+                    except Exception as e:
+                        logger.error(f"Error performing text search: {e}")
+                        text_results = []
+                    
+                    # Añadir solo resultados que no se hayan visto ya en Pinecone
+                    # (los que no se pudieron hidratar tampoco se vuelven a consultar)
+                    seen_ids = {str(m["id"]) for m in matches}
+                    seen_ids.update(str(t["id"]) for t in transactions)
                     
-                    # Añadir solo resultados que no estén ya incluidos
-                    existing_ids = {t["id"] for t in transactions}
+                    missing: List[str] = []
                     for result in text_results:
-                        if result["reference_id"] not in existing_ids:
-                            transaction = self.supabase.get_transaction(result["reference_id"])
-                            if transaction:
-                                transaction_dict = transaction.model_dump()
-                                
-                                # Corregir fechas antiguas (años anteriores a 2024)
-                                self._fix_transaction_dates(transaction_dict)
-                                
-                                transaction_dict["similarity"] = 0.5  # Valor predeterminado
-                                transactions.append(transaction_dict)
-                                existing_ids.add(transaction_dict["id"])
+                        reference_id = str(result.reference_id)
+                        if reference_id not in seen_ids:
+                            seen_ids.add(reference_id)
+                            missing.append(reference_id)
+                    missing = missing[:limit - len(transactions)]
+                    
+                    # Obtener todas las transacciones nuevas en una sola consulta
+                    found = self.hydrate(missing)
+                    
+                    # Similitud con valor predeterminado
+                    text_transactions = [
+                        self._to_result_dict(found[transaction_id], 0.5)
+                        for transaction_id in missing if transaction_id in found
+                    ]
+                    
+                    # Corregir fechas antiguas (años anteriores a 2024)
+                    self._fix_dates_batch(text_transactions)
+                    transactions.extend(text_transactions)
+                else:
+                    text_future.cancel()
                 
                 logger.info(f"Búsqueda completada, encontradas {len(transactions)} transacciones")
+                self._result_cache.set(cache_key, [dict(t) for t in transactions])
                 return transactions
             
             except Exception as e:
                 logger.error(f"Error en búsqueda vectorial: {e}")
+                text_future.cancel()
                 # Si falla la búsqueda vectorial, intentar con búsqueda de texto
                 logger.info("Intentando búsqueda de respaldo con texto")
                 fallback_results = self._fallback_search(query, filters, limit)
@@ -142,217 +458,301 @@ class SearchEngine:
             logger.error(f"Error buscando transacciones: {e}")
             return []
     
-    def _fix_transaction_dates(self, transaction: Dict[str, Any]) -> None:
+    def search_transactions_batch(self, queries: List[str], limit: int = 5,
+                                  filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run a semantic search for several queries at once
+        
+        Embeds all queries in one batch, queries Pinecone for each of them
+        concurrently and hydrates the union of matched IDs from Supabase in a
+        single request. Only the vector search is performed (no query
+        analysis, exact-match or text fallback).
+        
+        Args:
+            queries: The search queries
+            limit: Maximum number of results per query
+            filters: Optional filters applied to every query
+            
+        Returns:
+            One list of matching transactions per query, in the same order
+        """
+        if not queries:
+            return []
+        
+        try:
+            filter_dict = self._build_filter_dict(filters)
+            embeddings = _embed_queries(queries)
+            
+            # Consultar Pinecone en paralelo para cada embedding
+            query_results = list(_io_pool.map(
+                lambda embedding: self._query_transactions(embedding, filters, filter_dict, limit),
+                embeddings
+            ))
+            
+            matches_per_query = [results.get("matches") or [] for results in query_results]
+            
+            # Hidratar en una sola consulta las transacciones que no cubren los metadatos
+            ids = list(dict.fromkeys(
+                m["id"] for matches in matches_per_query for m in matches
+                if not self._metadata_covers(m.get("metadata"))
+            ))
+            found = self.hydrate(ids)
+            
+            return [self._transaction_hits(matches, found) for matches in matches_per_query]
+        
+        except Exception as e:
+            logger.error(f"Error en búsqueda por lotes: {e}")
+            return [[] for _ in queries]
+    
+    def _query_transactions(self, embedding: List[float], filters: Optional[Dict[str, Any]],
+                            filter_dict: Dict[str, Any], limit: int) -> Any:
+        """
+        Query Pinecone for transactions
+        
+        With per-type namespaces the type filter selects the namespace, so
+        the ANN search only walks that partition; without a type filter both
+        namespaces are queried and their matches merged by score.
+        """
+        if not self.pinecone.type_namespaces:
+            return self.pinecone.query_vector(
+                vector=embedding,
+                filter=filter_dict if filter_dict else None,
+                top_k=limit,
+                include_metadata=True
+            )
+        
+        transaction_type = (filters or {}).get("type")
+        if transaction_type:
+            namespaces = [self.pinecone.transaction_namespace(transaction_type)]
+        else:
+            namespaces = [t.value for t in TransactionType]
+        # El tipo ya lo determina el namespace (filter_dict es compartido: no modificarlo)
+        namespace_filter = {k: v for k, v in filter_dict.items() if k != "type"}
+        
+        matches = []
+        for namespace in namespaces:
+            results = self.pinecone.query_vector(
+                vector=embedding,
+                filter=namespace_filter if namespace_filter else None,
+                top_k=limit,
+                include_metadata=True,
+                namespace=namespace
+            )
+            if "matches" in results and results["matches"]:
+                matches.extend(results["matches"])
+        
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return {"matches": matches[:limit]}
+    
+    def _build_filter_dict(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Convert search filters to a Pinecone metadata filter
+        
+        The result is cached per distinct set of filters and shared between
+        calls, so it must not be modified.
+        """
+        if not filters:
+            return {}
+        
+        frozen = tuple(sorted(
+            ((key, tuple(value) if isinstance(value, list) else value) for key, value in filters.items()),
+            key=lambda item: item[0]
+        ))
+        try:
+            return _translate_filters_cached(frozen)
+        except TypeError:
+            # Valores no hashables: traducir sin caché
+            return _translate_filters(frozen)
+    
+    async def asearch_transactions(self, query: str, limit: int = 5,
+                                   filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_transactions for callers running an event loop
+        
+        The blocking Pinecone and Supabase calls run in a worker thread, so
+        concurrent searches do not block the loop.
+        """
+        return await asyncio.to_thread(self.search_transactions, query, limit, filters)
+    
+    async def asearch_transactions_many(self, queries: List[str], limit: int = 5,
+                                        filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run several full transaction searches concurrently
+        
+        Unlike search_transactions_batch, every query goes through the complete
+        pipeline (query analysis, exact match and text fallback).
+        
+        Returns:
+            One list of matching transactions per query, in the same order
+        """
+        # Cada búsqueda recibe su propia copia de los filtros (search_transactions los amplía)
+        return list(await asyncio.gather(*(
+            self.asearch_transactions(query, limit, dict(filters) if filters else None)
+            for query in queries
+        )))
+    
+    def _fix_transaction_dates(self, transaction: Dict[str, Any],
+                               current_year: Optional[int] = None) -> None:
         """
         Corrige las fechas de transacciones antiguas para que sean del año actual
         
         Args:
             transaction: Diccionario de transacción a corregir (se modifica in-place)
+            current_year: Año actual (se calcula si no se indica)
         """
-        current_year = datetime.now().year
+        if current_year is None:
+            current_year = datetime.now().year
         
         # Corregir fecha principal
-        if "date" in transaction and transaction["date"]:
-            try:
-                # Si es una cadena, convertir a datetime
-                if isinstance(transaction["date"], str):
-                    # Manejar distintos formatos de fecha
-                    if 'T' in transaction["date"]:
-                        # Formato ISO con hora
-                        date_str = transaction["date"].split('T')[0]
-                    else:
-                        date_str = transaction["date"]
-                    
-                    # Intentar convertir a datetime
-                    date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                    
-                    # Si el año es anterior al actual, actualizar al año actual
-                    if date_obj.year < current_year - 1:
-                        # Actualizar al mismo mes/día pero en el año actual
-                        new_date = date_obj.replace(year=current_year)
-                        transaction["date"] = new_date.strftime('%Y-%m-%d')
-                        logger.info(f"Fecha corregida: {date_obj.strftime('%Y-%m-%d')} → {new_date.strftime('%Y-%m-%d')}")
-            except Exception as e:
-                logger.warning(f"Error al corregir fecha: {e}")
+        corrected = self._fix_date_field(transaction, "date", current_year)
+        if corrected:
+            old_date, new_date = corrected
+            logger.info(f"Fecha corregida: {old_date.strftime('%Y-%m-%d')} → {new_date.strftime('%Y-%m-%d')}")
         
         # Corregir otras fechas relacionadas si existen
-        for date_field in ['payment_date', 'due_date', 'start_date', 'end_date']:
-            if date_field in transaction and transaction[date_field]:
-                try:
-                    # Si es una cadena, convertir a datetime
-                    if isinstance(transaction[date_field], str):
-                        # Manejar distintos formatos de fecha
-                        if 'T' in transaction[date_field]:
-                            # Formato ISO con hora
-                            date_str = transaction[date_field].split('T')[0]
-                        else:
-                            date_str = transaction[date_field]
-                        
-                        # Intentar convertir a datetime
-                        date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        
-                        # Si el año es anterior al actual, actualizar al año actual
-                        if date_obj.year < current_year - 1:
-                            # Actualizar al mismo mes/día pero en el año actual
-                            new_date = date_obj.replace(year=current_year)
-                            transaction[date_field] = new_date.strftime('%Y-%m-%d')
-                except Exception as e:
-                    logger.warning(f"Error al corregir fecha {date_field}: {e}")
-    
-    def _try_exact_match(self, query: str) -> List[Dict[str, Any]]:
-        """Intenta encontrar coincidencias exactas para consultas específicas"""
-        query_lower = query.lower()
+        for date_field in ('payment_date', 'due_date', 'start_date', 'end_date'):
+            self._fix_date_field(transaction, date_field, current_year)
+    
+    def _fix_dates_batch(self, transactions: List[Dict[str, Any]]) -> None:
+        """Corrige las fechas antiguas de varias transacciones calculando el año una sola vez"""
+        # Solo para datos sin migrar (ver data/migrations/fix_legacy_dates.py)
+        if not settings.FIX_LEGACY_DATES:
+            return
+        
         current_year = datetime.now().year
+        for transaction in transactions:
+            self._fix_transaction_dates(transaction, current_year)
+    
+    def _fix_date_field(self, transaction: Dict[str, Any], date_field: str,
+                        current_year: int) -> Optional[Tuple[datetime, datetime]]:
+        """
+        Mueve al año actual una fecha en texto de hace más de un año
+        
+        Returns:
+            (fecha original, fecha corregida) si se ha corregido, None en otro caso
+        """
+        value = transaction.get(date_field)
+        # Solo se corrigen fechas en texto
+        if not value or not isinstance(value, str):
+            return None
         
         try:
-            # Buscar coincidencias exactas en categorías
-            categories = ["Software", "Payroll", "Marketing", "Office", "Services", 
-                         "Hardware", "Travel", "Legal", "Taxes", "Revenue", "Rent"]
+            # Comprobar el año sin parsear la fecha (caso habitual: nada que corregir)
+            if value[:4].isdigit() and int(value[:4]) >= current_year - 1:
+                return None
             
-            for category in categories:
-                if category.lower() in query_lower:
-                    transactions = self.supabase.list_transactions(
-                        limit=10,
-                        category=category
-                    )
-                    if transactions:
-                        # Convertir a diccionarios y actualizar fechas antiguas
-                        results = []
-                        for tx in transactions:
-                            tx_dict = tx.model_dump()
-                            # Corregir fechas antiguas
-                            self._fix_transaction_dates(tx_dict)
-                            results.append(tx_dict)
-                        return results
+            # Manejar distintos formatos de fecha (ISO con hora o solo fecha)
+            date_obj = datetime.fromisoformat(_as_date_str(value).replace('Z', '+00:00'))
             
-            # Buscar coincidencias en tipo (ingreso/gasto)
-            if "ingreso" in query_lower or "ingresos" in query_lower or "income" in query_lower:
-                transactions = self.supabase.list_transactions(
-                    limit=10,
-                    type="income"
-                )
-                if transactions:
-                    # Actualizar fechas antiguas
-                    results = []
-                    for tx in transactions:
-                        tx_dict = tx.model_dump()
-                        # Corregir fechas antiguas
-                        self._fix_transaction_dates(tx_dict)
-                        results.append(tx_dict)
-                    return results
-            
-            if "gasto" in query_lower or "gastos" in query_lower or "expense" in query_lower:
+            # Si el año es anterior al actual, actualizar al mismo mes/día en el año actual
+            if date_obj.year < current_year - 1:
+                new_date = date_obj.replace(year=current_year)
+                transaction[date_field] = new_date.strftime('%Y-%m-%d')
+                return date_obj, new_date
+        except Exception as e:
+            logger.warning(f"Error al corregir fecha {date_field}: {e}")
+        return None
+    
+    def _try_exact_match(self, query: str, query_lower: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Intenta encontrar coincidencias exactas para consultas específicas"""
+        # Palabras de la consulta, en orden
+        tokens = _WORD_RE.findall(query_lower if query_lower is not None else query.lower())
+        token_set = set(tokens)
+        
+        try:
+            # Buscar coincidencias exactas en categorías
+            category = next((_EXACT_CATEGORIES[t] for t in tokens if t in _EXACT_CATEGORIES), None)
+            if category:
                 transactions = self.supabase.list_transactions(
                     limit=10,
-                    type="expense"
+                    category=category
                 )
                 if transactions:
-                    # Actualizar fechas antiguas
-                    results = []
-                    for tx in transactions:
-                        tx_dict = tx.model_dump()
-                        # Corregir fechas antiguas
-                        self._fix_transaction_dates(tx_dict)
-                        results.append(tx_dict)
-                    return results
+                    return self._to_fixed_dicts(transactions)
+            
+            # Buscar coincidencias en tipo (ingreso/gasto)
+            for transaction_type, type_tokens in (("income", _INCOME_TOKENS), ("expense", _EXPENSE_TOKENS)):
+                if not token_set.isdisjoint(type_tokens):
+                    transactions = self.supabase.list_transactions(
+                        limit=10,
+                        type=transaction_type
+                    )
+                    if transactions:
+                        return self._to_fixed_dicts(transactions)
                     
             return []
         except Exception as e:
             logger.error(f"Error en búsqueda de coincidencia exacta: {e}")
             return []
     
-    def _extract_temporal_info(self, query: str) -> Optional[List[datetime]]:
-        """Extract temporal information from query"""
-        query_lower = query.lower()
+    def _to_fixed_dicts(self, transactions: List[Any]) -> List[Dict[str, Any]]:
+        """Convert transactions to dictionaries, updating old dates"""
+        results = _TX_LIST_ADAPTER.dump_python(transactions)
+        # Corregir fechas antiguas
+        self._fix_dates_batch(results)
+        return results
+    
+    def _extract_temporal_info(self, query: str, query_lower: Optional[str] = None) -> Optional[List[datetime]]:
+        """Extract temporal information from query (query_lower avoids lowercasing it again)"""
+        if query_lower is None:
+            query_lower = query.lower()
+        
+        # Sin ninguna expresión temporal no hay nada que calcular
+        if not _TEMPORAL_RE.search(query_lower):
+            return None
+        
         now = datetime.now()
+        period = next((name for name, pattern in _RELATIVE_PERIODS if pattern.search(query_lower)), None)
         
         # Último mes
-        if "último mes" in query_lower or "mes pasado" in query_lower or "last month" in query_lower:
-            # Primer día del mes actual
-            first_day_current = datetime(now.year, now.month, 1)
-            # Último día del mes pasado
-            last_day_previous = first_day_current - timedelta(days=1)
-            # Primer día del mes pasado
-            first_day_previous = datetime(last_day_previous.year, last_day_previous.month, 1)
-            return [first_day_previous, last_day_previous]
+        if period == "last_month":
+            if now.month == 1:
+                return list(_month_bounds(now.year - 1, 12))
+            return list(_month_bounds(now.year, now.month - 1))
         
         # Este mes
-        if "este mes" in query_lower or "mes actual" in query_lower or "this month" in query_lower:
-            # Primer día del mes actual
-            first_day = datetime(now.year, now.month, 1)
-            # Último día (aproximado)
-            last_day = datetime(now.year, now.month + 1 if now.month < 12 else 1, 1) - timedelta(days=1)
-            return [first_day, last_day]
+        if period == "this_month":
+            return list(_month_bounds(now.year, now.month))
         
         # Año actual
-        if "este año" in query_lower or "año actual" in query_lower or "this year" in query_lower:
+        if period == "this_year":
             return [datetime(now.year, 1, 1), datetime(now.year, 12, 31)]
         
         # Año pasado
-        if "año pasado" in query_lower or "last year" in query_lower:
+        if period == "last_year":
             return [datetime(now.year - 1, 1, 1), datetime(now.year - 1, 12, 31)]
         
         # Meses específicos
-        months = {
-            "enero": 1, "february": 1,
-            "febrero": 2, "february": 2,
-            "marzo": 3, "march": 3,
-            "abril": 4, "april": 4,
-            "mayo": 5, "may": 5,
-            "junio": 6, "june": 6,
-            "julio": 7, "july": 7,
-            "agosto": 8, "august": 8,
-            "septiembre": 9, "september": 9,
-            "octubre": 10, "october": 10,
-            "noviembre": 11, "november": 11,
-            "diciembre": 12, "december": 12
-        }
-        
-        for month_name, month_num in months.items():
-            if month_name in query_lower:
-                # Si se menciona un año específico
-                year = now.year
-                for i in range(now.year - 3, now.year + 2):  # Buscar años cercanos
-                    if str(i) in query:
-                        year = i
-                        break
-                
-                return [datetime(year, month_num, 1), 
-                        (datetime(year, month_num + 1, 1) if month_num < 12 else datetime(year + 1, 1, 1)) - timedelta(days=1)]
+        match = _MONTH_RE.search(query_lower)
+        if match:
+            month_num = _MONTHS[match.group(1)]
+            
+            # Si se menciona un año específico (solo años cercanos)
+            year = now.year
+            nearby_years = [int(y) for y in _YEAR_RE.findall(query) if now.year - 3 <= int(y) < now.year + 2]
+            if nearby_years:
+                year = min(nearby_years)
+            
+            return list(_month_bounds(year, month_num))
         
         # Si no se encuentra información temporal, devolver None
         return None
     
-    def _extract_category_type_filters(self, query: str) -> Dict[str, str]:
-        """Extract category and type filters from query"""
-        query_lower = query.lower()
+    def _extract_category_type_filters(self, query: str, query_lower: Optional[str] = None) -> Dict[str, str]:
+        """Extract category and type filters from query (query_lower avoids lowercasing it again)"""
+        if query_lower is None:
+            query_lower = query.lower()
         filters = {}
         
         # Detectar categorías comunes
-        categories = {
-            "software": "Software",
-            "nómina": "Payroll", "payroll": "Payroll",
-            "marketing": "Marketing",
-            "oficina": "Office", "office": "Office",
-            "servicios": "Services", "services": "Services",
-            "hardware": "Hardware",
-            "viajes": "Travel", "travel": "Travel",
-            "legal": "Legal",
-            "impuestos": "Taxes", "taxes": "Taxes",
-            "ingresos": "Revenue", "revenue": "Revenue",
-            "ventas": "Revenue", "sales": "Revenue",
-            "alquiler": "Rent", "rent": "Rent"
-        }
-        
-        for keyword, category in categories.items():
-            if keyword in query_lower:
-                filters["category"] = category
-                break
+        match = _CATEGORY_RE.search(query_lower)
+        if match:
+            filters["category"] = _CATEGORY_KEYWORDS[match.group(1)]
         
         # Detectar tipo (ingreso/gasto)
-        if "ingreso" in query_lower or "ingresos" in query_lower or "income" in query_lower:
+        if _INCOME_RE.search(query_lower):
             filters["type"] = "income"
-        elif "gasto" in query_lower or "gastos" in query_lower or "expense" in query_lower:
+        elif _EXPENSE_RE.search(query_lower):
             filters["type"] = "expense"
         
         return filters
@@ -362,51 +762,24 @@ class SearchEngine:
         try:
             logger.info("Ejecutando búsqueda de respaldo")
             
-            # Intentar primero búsqueda de texto
-            text_results = self.text_search(query, "transaction", limit * 2)  # Buscar más resultados para filtrar después
+            # Intentar primero búsqueda de texto (los filtros se aplican en la base de datos)
+            text_results = self.text_search(query, "transaction", limit, filters)
             
             if text_results:
-                transactions = []
-                for result in text_results:
-                    transaction = self.supabase.get_transaction(result["reference_id"])
-                    if transaction:
-                        tx_dict = transaction.model_dump()
-                        # Corregir fechas antiguas
-                        self._fix_transaction_dates(tx_dict)
-                        transactions.append(tx_dict)
-                
-                # Aplicar filtros si es necesario
-                if filters and transactions:
-                    filtered_transactions = []
-                    for tx in transactions:
-                        include = True
-                        
-                        for key, value in filters.items():
-                            if key == "type" and tx.get("type") != value:
-                                include = False
-                                break
-                            elif key == "category" and tx.get("category") != value:
-                                include = False
-                                break
-                            elif key == "date_range" and isinstance(value, list) and len(value) == 2:
-                                tx_date = tx.get("date")
-                                if isinstance(tx_date, str):
-                                    tx_date = datetime.fromisoformat(tx_date.replace("Z", "+00:00"))
-                                
-                                if not (value[0] <= tx_date <= value[1]):
-                                    include = False
-                                    break
-                        
-                        if include:
-                            filtered_transactions.append(tx)
-                    
-                    return filtered_transactions[:limit]
+                # Obtener todas las transacciones en una sola consulta
+                found = self.hydrate([str(result["reference_id"]) for result in text_results])
+                transactions = _TX_LIST_ADAPTER.dump_python([
+                    found[str(result["reference_id"])]
+                    for result in text_results if str(result["reference_id"]) in found
+                ])
+                # Corregir fechas antiguas
+                self._fix_dates_batch(transactions)
                 
                 return transactions[:limit]
             
-            # Si no hay resultados, obtener las transacciones más recientes
+            # Si no hay resultados, obtener las transacciones más recientes que cumplan los filtros
             logger.info("Sin resultados de texto, devolviendo transacciones recientes")
-            recent_transactions = self.supabase.list_transactions(limit=limit)
+            recent_transactions = self.supabase.list_transactions(limit=limit, **(filters or {}))
             return [t.model_dump() for t in recent_transactions]
             
         except Exception as e:
@@ -414,15 +787,39 @@ class SearchEngine:
             return []
     
     def search_documents(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search for documents using semantic search"""
+        """
+        Search for documents using semantic search
+        
+        Identical calls within a minute are answered from the response cache.
+        """
+        cache_key = ("document", _normalize_query(query or ""), limit, self._result_shape())
+        cached = self._response_cache.get(cache_key)
+        if cached is not None:
+            return [dict(d) for d in cached]
+        
+        documents = self._search_documents(query, limit)
+        # No guardar respuestas vacías: pueden deberse a un error transitorio
+        if documents:
+            self._response_cache.set(cache_key, [dict(d) for d in documents])
+        return documents
+    
+    def _search_documents(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """search_documents without the response cache"""
         try:
             # Generate embedding for the query
-            query_embedding = generate_embedding(query)
+            query_embedding = _embed_query(query)
+            filter_dict = {"type": {"$eq": "document"}}
+            
+            # Reuse recent results for the same search
+            cache_key = self._result_cache_key("document", query_embedding, filter_dict, limit)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                return [dict(d) for d in cached]
             
             # Search in Pinecone with filter for documents
             results = self.pinecone.query_vector(
                 vector=query_embedding,
-                filter={"type": {"$eq": "document"}},
+                filter=filter_dict,
                 top_k=limit,
                 include_metadata=True
             )
@@ -432,26 +829,37 @@ class SearchEngine:
             
             # Check if we have matches
             if "matches" in results and results["matches"]:
-                for match in results["matches"]:
-                    # Get full document from Supabase
-                    document_id = match["id"]
-                    document = self.supabase.get_document(document_id)
+                # Get all full documents from Supabase in one request
+                matches = results["matches"]
+                found = self._fetch_by_ids(
+                    [m["id"] for m in matches],
+                    self.supabase.get_documents_by_ids,
+                    self.supabase.get_document
+                )
+                
+                # Iterate in Pinecone order to keep the ranking
+                for match in matches:
+                    document = found.get(match["id"])
                     
                     if document:
                         # Add similarity score to document
-                        document_dict = document.model_dump()
-                        document_dict["similarity"] = match["score"]
-                        documents.append(document_dict)
+                        documents.append(self._to_result_dict(document, match["score"]))
             
+            self._result_cache.set(cache_key, [dict(d) for d in documents])
             return documents
         
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             return []
     
+    async def asearch_documents(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Async variant of search_documents (runs the blocking calls in a worker thread)"""
+        return await asyncio.to_thread(self.search_documents, query, limit)
+    
     def text_search(self, query: str, 
                    reference_type: Optional[str] = None, 
-                   limit: int = 10) -> List[Dict[str, Any]]:
+                   limit: int = 10,
+                   filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Perform a text-based search using Supabase's full-text search
         
@@ -459,19 +867,19 @@ class SearchEngine:
             query: The search query
             reference_type: Optional type filter (e.g., "transaction", "document")
             limit: Maximum number of results to return
+            filters: Optional transaction filters (type, category, date_range)
             
         Returns:
             List of matching items
         """
         try:
             # Use Supabase's text search
-            results = self.supabase.search_text(query, reference_type, limit)
-            
-            # Process and return results
-            return [item.model_dump() for item in results]
+            results = self.supabase.search_text(query, reference_type, limit, **(filters or {}))
         except Exception as e:
             logger.error(f"Error performing text search: {e}")
             return []
+        
+        return _INDEX_LIST_ADAPTER.dump_python(results)
     
     def _generate_search_explanation(self, results: Dict[str, Any]) -> str:
         """Generate a human-friendly explanation of search results"""
@@ -488,19 +896,15 @@ class SearchEngine:
                 if len(transactions) == 1:
                     tx = transactions[0]
                     # Obtener la fecha de forma segura
-                    if isinstance(tx.get('date'), datetime):
-                        tx_date = tx['date'].strftime('%Y-%m-%d')
-                    elif isinstance(tx.get('date'), str):
-                        tx_date = tx['date'].split('T')[0] if 'T' in tx['date'] else tx['date']
-                    else:
-                        tx_date = "fecha desconocida"
+                    tx_date = _as_date_str(tx.get('date')) or "fecha desconocida"
                         
                     explanation.append(f"Found 1 transaction: {tx['type']} of {tx['currency']} {tx['amount']} for {tx['description']} on {tx_date}.")
                 else:
                     explanation.append(f"Found {len(transactions)} transactions.")
                     # Summarize transaction types
-                    expenses = sum(1 for t in transactions if t['type'] == 'expense')
-                    incomes = sum(1 for t in transactions if t['type'] == 'income')
+                    type_counts = Counter(t['type'] for t in transactions)
+                    expenses = type_counts.get('expense', 0)
+                    incomes = type_counts.get('income', 0)
                     
                     if expenses > 0:
                         explanation.append(f"- {expenses} {'expense' if expenses == 1 else 'expenses'}")
@@ -514,10 +918,7 @@ class SearchEngine:
                 else:
                     explanation.append(f"Found {len(documents)} documents.")
                     # Summarize document types
-                    doc_types = {}
-                    for d in documents:
-                        doc_type = d['type']
-                        doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
+                    doc_types = Counter(d['type'] for d in documents)
                     
                     for doc_type, count in doc_types.items():
                         explanation.append(f"- {count} {doc_type}{'s' if count > 1 else ''}")
@@ -526,4 +927,9 @@ class SearchEngine:
             
         except Exception as e:
             logger.error(f"Error generating search explanation: {e}")
-            return "Search results found. Unable to generate detailed explanation."
\ No newline at end of file
+            return "Search results found. Unable to generate detailed explanation."
+
+@functools.lru_cache(maxsize=None)
+def get_search_engine(hydrate: str = "full") -> SearchEngine:
+    """Process-wide SearchEngine per hydrate mode, shared by the services"""
+    return SearchEngine(hydrate=hydrate)
@@ -7,14 +7,36 @@ load_dotenv()
 url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(url, key)
+dimension: int = int(os.getenv("VECTOR_DIMENSION", "1536"))
+
+def embedding_type_guard_sql(table: str, condition: str, statements: list) -> str:
+    """
+    Wraps statements in a DO block that only runs them while the current type
+    of table.embedding matches condition (e.g. "= 'jsonb'"). Changing a column
+    type rewrites the whole table, so it must not happen on every migration
+    """
+    body = "\n".join(f"            {statement}" for statement in statements)
+    return f"""
+    DO $$
+    BEGIN
+        IF (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+            WHERE attrelid = '{table}'::regclass AND attname = 'embedding') {condition} THEN
+{body}
+        END IF;
+    END $$;
+    """
 
 def create_tables():
     """Creates all necessary tables in Supabase"""
     print("Creating tables in Supabase...")
     
+    # pgvector: embeddings stored as vectors so similarity runs in the database
+    extension_sql = "CREATE EXTENSION IF NOT EXISTS vector;"
+    # pg_trgm: trigram indexes for the ILIKE '%...%' description filter
+    trgm_extension_sql = "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+    
     # Create transactions table
-    supabase.table("transactions").execute()
-    transactions_sql = """
+    transactions_sql = f"""
     CREATE TABLE IF NOT EXISTS transactions (
         id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
         type VARCHAR(10) NOT NULL CHECK (type IN ('income', 'expense')),
@@ -28,7 +50,7 @@ def create_tables():
         recurring_id UUID,
         document_id UUID,
         metadata JSONB,
-        embedding JSONB,
+        embedding halfvec({dimension}),
         created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
         updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
     );
@@ -54,7 +76,7 @@ def create_tables():
     """
     
     # Create documents table
-    documents_sql = """
+    documents_sql = f"""
     CREATE TABLE IF NOT EXISTS documents (
         id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
         name VARCHAR(255) NOT NULL,
@@ -62,7 +84,7 @@ def create_tables():
         file_path VARCHAR(255) NOT NULL,
         content_text TEXT,
         extracted_data JSONB,
-        embedding JSONB,
+        embedding vector({dimension}),
         transaction_id UUID,
         metadata JSONB,
         created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
@@ -99,28 +121,148 @@ def create_tables():
     """
     
     # Create search_index table
-    search_index_sql = """
+    search_index_sql = f"""
     CREATE TABLE IF NOT EXISTS search_index (
         id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
         reference_type VARCHAR(50) NOT NULL,
         reference_id UUID NOT NULL,
         content TEXT NOT NULL,
-        embedding JSONB,
+        embedding vector({dimension}),
         metadata JSONB,
         created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
         updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
     );
     """
     
-    # Execute all SQL statements
-    for sql in [transactions_sql, recurring_items_sql, documents_sql, 
-                projections_sql, categories_sql, search_index_sql]:
-        try:
-            # Using the SQL API to execute raw SQL
-            supabase.postgrest.rpc("execute_sql", {"sql": sql}).execute()
-            print(f"Created table: {sql.split('CREATE TABLE IF NOT EXISTS')[1].split('(')[0].strip()}")
-        except Exception as e:
-            print(f"Error creating table: {e}")
+    # Tables created before pgvector stored embeddings as JSONB
+    vector_columns_sql = [
+        embedding_type_guard_sql(table, "= 'jsonb'", [
+            f"ALTER TABLE {table} ALTER COLUMN embedding TYPE vector({dimension}) USING embedding::text::vector;"
+        ])
+        for table in ["documents", "search_index"]
+    ]
+    # Transaction embeddings are stored as halfvec (float16): half the row size,
+    # enough precision for cosine search. The HNSW index is rebuilt below with
+    # the halfvec operator class
+    vector_columns_sql.append(embedding_type_guard_sql("transactions", f"<> 'halfvec({dimension})'", [
+        "DROP INDEX IF EXISTS transactions_embedding_hnsw_idx;",
+        f"ALTER TABLE transactions ALTER COLUMN embedding TYPE halfvec({dimension}) "
+        f"USING embedding::text::halfvec({dimension});",
+    ]))
+    
+    # Parameterized full-text search used by SupabaseClient.search_text
+    search_content_sql = """
+    CREATE OR REPLACE FUNCTION search_content(
+        q TEXT,
+        ref_type TEXT DEFAULT NULL,
+        lim INT DEFAULT 10,
+        tx_type TEXT DEFAULT NULL,
+        tx_category TEXT DEFAULT NULL,
+        date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+        date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL
+    )
+    RETURNS SETOF search_index
+    LANGUAGE sql STABLE
+    AS $$
+        SELECT si.*
+        FROM search_index si
+        LEFT JOIN transactions t ON t.id = si.reference_id
+        WHERE to_tsvector('spanish', si.content) @@ plainto_tsquery('spanish', q)
+          AND (ref_type IS NULL OR si.reference_type = ref_type)
+          AND (tx_type IS NULL OR t.type = tx_type)
+          AND (tx_category IS NULL OR t.category = tx_category)
+          AND (date_from IS NULL OR t.date >= date_from)
+          AND (date_to IS NULL OR t.date <= date_to)
+        LIMIT lim
+    $$;
+    """
+    
+    # Bulk next_date update used by RecurringService.process_due_items
+    update_next_dates_sql = """
+    CREATE OR REPLACE FUNCTION update_recurring_next_dates(updates JSONB)
+    RETURNS INT
+    LANGUAGE sql
+    AS $$
+        WITH updated AS (
+            UPDATE recurring_items r
+            SET next_date = u.next_date, updated_at = NOW()
+            FROM jsonb_to_recordset(updates) AS u(id UUID, next_date TIMESTAMP WITH TIME ZONE)
+            WHERE r.id = u.id
+            RETURNING 1
+        )
+        SELECT count(*)::INT FROM updated
+    $$;
+    """
+    
+    # Aggregations used by ReportService, so reports do not download every row
+    transaction_summary_sql = """
+    CREATE OR REPLACE FUNCTION transaction_summary(
+        date_from TIMESTAMP WITH TIME ZONE,
+        date_to TIMESTAMP WITH TIME ZONE
+    )
+    RETURNS TABLE(type TEXT, category TEXT, total NUMERIC, n BIGINT)
+    LANGUAGE sql STABLE
+    AS $$
+        SELECT t.type, t.category, sum(t.amount), count(*)
+        FROM transactions t
+        WHERE t.date >= date_from AND t.date <= date_to
+        GROUP BY t.type, t.category
+    $$;
+    """
+    
+    transaction_monthly_totals_sql = """
+    CREATE OR REPLACE FUNCTION transaction_monthly_totals(
+        date_from TIMESTAMP WITH TIME ZONE,
+        date_to TIMESTAMP WITH TIME ZONE
+    )
+    RETURNS TABLE(month TEXT, type TEXT, total NUMERIC)
+    LANGUAGE sql STABLE
+    AS $$
+        SELECT to_char(t.date AT TIME ZONE 'UTC', 'YYYY-MM'), t.type, sum(t.amount)
+        FROM transactions t
+        WHERE t.date >= date_from AND t.date <= date_to
+        GROUP BY 1, 2
+    $$;
+    """
+    
+    # Indexes
+    indexes_sql = [
+        # Full-text search over search_index.content (matches the search_content predicate)
+        "CREATE INDEX IF NOT EXISTS search_index_fts ON search_index USING GIN (to_tsvector('spanish', content));",
+        # Keyset pagination of list_transactions (ORDER BY date DESC, id DESC)
+        "CREATE INDEX IF NOT EXISTS transactions_date_id_idx ON transactions (date DESC, id DESC);",
+        # list_transactions filtered by category or type, still ordered by date
+        "CREATE INDEX IF NOT EXISTS transactions_category_date_idx ON transactions (category, date DESC);",
+        "CREATE INDEX IF NOT EXISTS transactions_type_date_idx ON transactions (type, date DESC);",
+        # list_transactions(search=...) uses description ILIKE '%term%'
+        "CREATE INDEX IF NOT EXISTS transactions_description_trgm_idx ON transactions "
+        "USING GIN (description gin_trgm_ops);",
+        # list_recurring_items orders by next_date; process_due_items filters on it
+        "CREATE INDEX IF NOT EXISTS recurring_items_next_date_idx ON recurring_items (next_date);",
+        # Approximate nearest neighbours for cosine search on transaction embeddings
+        "CREATE INDEX IF NOT EXISTS transactions_embedding_hnsw_idx ON transactions "
+        "USING hnsw (embedding halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);",
+    ]
+    
+    # Send the whole schema in a single execute_sql call: one round trip, and
+    # since the RPC runs in one transaction a failure leaves nothing half-created
+    # (BEGIN/COMMIT cannot be issued from inside the function)
+    schema_sql = "\n".join([
+        extension_sql, trgm_extension_sql,
+        transactions_sql, recurring_items_sql, documents_sql,
+        projections_sql, categories_sql, search_index_sql,
+        *vector_columns_sql,
+        search_content_sql,
+        update_next_dates_sql,
+        transaction_summary_sql, transaction_monthly_totals_sql,
+        *indexes_sql,
+    ])
+    
+    try:
+        supabase.postgrest.rpc("execute_sql", {"sql": schema_sql}).execute()
+    except Exception as e:
+        print(f"Error creating tables: {e}")
+        return
     
     print("Tables created successfully!")
 
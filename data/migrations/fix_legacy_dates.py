@@ -0,0 +1,77 @@
+import os
+from supabase import create_client, Client
+from pinecone import Pinecone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+url: str = os.getenv("SUPABASE_URL")
+key: str = os.getenv("SUPABASE_KEY")
+supabase: Client = create_client(url, key)
+
+INDEX_NAME = "finance-ai-index"
+# Same setting as PineconeClient: transaction vectors live in an income/expense namespace
+TYPE_NAMESPACES = os.getenv("PINECONE_TYPE_NAMESPACES", "false").strip().lower() in ("1", "true", "yes", "on")
+
+def fix_legacy_dates():
+    """
+    Moves transactions dated more than a year ago to the current year,
+    keeping month and day, in Supabase and in the Pinecone metadata.
+    
+    Replaces the per-query date correction done by the search engine
+    (settings.FIX_LEGACY_DATES).
+    """
+    print("Fixing legacy transaction dates...")
+    
+    # date and payment_date are checked independently, as the per-query
+    # correction did; date_fixed tells which rows need their vector updated
+    sql = """
+    WITH legacy AS (
+        SELECT id,
+               EXTRACT(YEAR FROM date) < EXTRACT(YEAR FROM NOW()) - 1 AS date_fixed,
+               COALESCE(EXTRACT(YEAR FROM payment_date) < EXTRACT(YEAR FROM NOW()) - 1, FALSE) AS payment_date_fixed
+        FROM transactions
+        WHERE EXTRACT(YEAR FROM date) < EXTRACT(YEAR FROM NOW()) - 1
+           OR EXTRACT(YEAR FROM payment_date) < EXTRACT(YEAR FROM NOW()) - 1
+    )
+    UPDATE transactions t
+    SET date = CASE
+            WHEN l.date_fixed
+            THEN t.date + make_interval(years => (EXTRACT(YEAR FROM NOW()) - EXTRACT(YEAR FROM t.date))::int)
+            ELSE t.date
+        END,
+        payment_date = CASE
+            WHEN l.payment_date_fixed
+            THEN t.payment_date + make_interval(years => (EXTRACT(YEAR FROM NOW()) - EXTRACT(YEAR FROM t.payment_date))::int)
+            ELSE t.payment_date
+        END,
+        updated_at = NOW()
+    FROM legacy l
+    WHERE t.id = l.id
+    RETURNING t.id, t.type, t.date, l.date_fixed
+    """
+    
+    try:
+        response = supabase.postgrest.rpc("execute_sql", {"sql": sql}).execute()
+        rows = response.data or []
+        print(f"Updated {len(rows)} transactions in Supabase")
+    except Exception as e:
+        print(f"Error updating transactions: {e}")
+        return
+    
+    # Keep the date stored as Pinecone metadata in sync (payment_date is not stored there)
+    vector_rows = [row for row in rows if row["date_fixed"]]
+    if vector_rows:
+        try:
+            index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(INDEX_NAME)
+            for row in vector_rows:
+                kwargs = {"namespace": row["type"]} if TYPE_NAMESPACES else {}
+                index.update(id=str(row["id"]), set_metadata={"date": str(row["date"])}, **kwargs)
+            print(f"Updated {len(vector_rows)} vectors in Pinecone")
+        except Exception as e:
+            print(f"Error updating Pinecone metadata: {e}")
+    
+    print("Legacy dates fixed successfully!")
+
+if __name__ == "__main__":
+    fix_legacy_dates()
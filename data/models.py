@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any, Union
 from uuid import UUID, uuid4
 from enum import Enum
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, TypeAdapter, model_validator, validator
 
 # Enums para tipos y categorías
 class TransactionType(str, Enum):
@@ -130,4 +130,23 @@ class RecurringItemCreate(BaseModel):
     start_date: datetime
     end_date: Optional[datetime] = None
     next_date: Optional[datetime] = None
-    metadata: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = None
+
+    @model_validator(mode='after')
+    def default_next_date(self):
+        # La primera ocurrencia es la fecha de inicio
+        if self.next_date is None:
+            self.next_date = self.start_date
+        return self
+
+# Validador de listas compilado una sola vez (crearlo por llamada es caro)
+TRANSACTION_LIST_ADAPTER = TypeAdapter(List[TransactionCreate])
+
+def parse_transactions(payload: Union[str, bytes]) -> List[TransactionCreate]:
+    """
+    Parse and validate a JSON array of transactions in a single call
+    
+    For bulk imports: the JSON is parsed and every element validated by
+    pydantic-core, without building intermediate dicts in Python.
+    """
+    return TRANSACTION_LIST_ADAPTER.validate_json(payload)
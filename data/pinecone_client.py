@@ -1,23 +1,74 @@
-import os
-from typing import List, Dict, Any, Union, Optional
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Union, Optional, Iterable, Callable
 from uuid import UUID
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
-from dotenv import load_dotenv
+from config.settings import settings
 from config.logging import logger
 
-load_dotenv()
+# El cliente gRPC es opcional (pip install "pinecone[grpc]")
+try:
+    from pinecone.grpc import PineconeGRPC
+except ImportError:
+    PineconeGRPC = None
+
+# El cliente asyncio también es opcional (pip install "pinecone[asyncio]")
+try:
+    from pinecone import PineconeAsyncio
+except ImportError:
+    PineconeAsyncio = None
+
+# Pinecone acepta como máximo 100 vectores (y 2MB) por petición de upsert
+UPSERT_BATCH_SIZE = 100
+# ... y como máximo 1000 IDs por petición de borrado
+DELETE_BATCH_SIZE = 1000
+# Peticiones (upsert o borrado) en vuelo a la vez
+POOL_THREADS = 8
+# Las peticiones por lotes se lanzan aquí como llamadas normales: no todas las
+# versiones del SDK aceptan async_req (la 10.x lo rechaza en upsert y delete)
+_request_pool = ThreadPoolExecutor(max_workers=POOL_THREADS)
+# Decimales de los valores enviados por REST: en JSON cada double ocupa hasta
+# 20 caracteres y un embedding normalizado no necesita más de 6 decimales
+REST_VECTOR_DECIMALS = 6
+
+def _rest_values(vector: Union[List[float], np.ndarray]) -> List[float]:
+    """Vector values rounded for a JSON request body (about half the bytes)"""
+    return np.round(np.asarray(vector, dtype=np.float64), REST_VECTOR_DECIMALS).tolist()
+
+def _grpc_values(vector: Union[List[float], np.ndarray]) -> List[float]:
+    """Vector values for a gRPC request (lists pass through, arrays are converted here)"""
+    return vector.tolist() if isinstance(vector, np.ndarray) else vector
 
 class PineconeClient:
     def __init__(self):
         """Initialize Pinecone client with API key from environment"""
-        self.api_key = os.getenv("PINECONE_API_KEY")
-        self.environment = os.getenv("PINECONE_ENVIRONMENT", "gcp-starter")
-        self.dimension = int(os.getenv("VECTOR_DIMENSION", "1536"))
+        self.api_key = settings.PINECONE_API_KEY
+        self.environment = settings.PINECONE_ENVIRONMENT
+        self.dimension = settings.VECTOR_DIMENSION
         self.index_name = "finance-ai-index"
-        self.client = Pinecone(api_key=self.api_key)
+        self.use_grpc = settings.PINECONE_USE_GRPC
+        # Guardar las transacciones en un namespace por tipo (income/expense)
+        self.type_namespaces = settings.PINECONE_TYPE_NAMESPACES
+        
+        # gRPC envía los valores como float32 binario; REST como texto JSON
+        self._rest = not (self.use_grpc and PineconeGRPC is not None)
+        if not self._rest:
+            # gRPC sobre HTTP/2: un único canal multiplexa las consultas concurrentes
+            self.client = PineconeGRPC(api_key=self.api_key)
+        else:
+            if self.use_grpc:
+                logger.warning("PINECONE_USE_GRPC is set but pinecone[grpc] is not installed, using REST")
+            self.client = Pinecone(api_key=self.api_key)
+        # setup_index ya comprobó (o creó) el índice
+        self._ready = False
     
     def setup_index(self):
-        """Create the index if it doesn't exist"""
+        """Create the index if it doesn't exist (checked once per client)"""
+        if self._ready:
+            return self.index
         try:
             # Verificar si el índice ya existe
             existing_indexes = self.client.list_indexes().names()
@@ -41,94 +92,246 @@ class PineconeClient:
             else:
                 logger.info(f"Pinecone index {self.index_name} already exists")
                 
-            # Connect to the index
-            self.index = self.client.Index(self.index_name)
+            self._ready = True
             return self.index
         except Exception as e:
             logger.error(f"Error setting up Pinecone index: {e}")
             raise
     
+    def transaction_namespace(self, transaction_type: Optional[str]) -> Optional[str]:
+        """Namespace holding transactions of the given type (None = default namespace)"""
+        if self.type_namespaces and transaction_type:
+            return str(getattr(transaction_type, "value", transaction_type))
+        return None
+    
+    @functools.cached_property
+    def index(self):
+        """The index connection, opened on first use and then a plain attribute"""
+        return self._connect_index()
+    
     def get_index(self):
         """Get the index instance"""
-        if not hasattr(self, 'index'):
-            # Connect to the index
-            self.index = self.client.Index(self.index_name)
         return self.index
     
+    def _connect_index(self):
+        """Open the index connection"""
+        return self.client.Index(self.index_name)
+    
     def upsert_vector(self, 
                       id: Union[str, UUID], 
-                      vector: List[float], 
-                      metadata: Optional[Dict[str, Any]] = None):
+                      vector: Union[List[float], np.ndarray], 
+                      metadata: Optional[Dict[str, Any]] = None,
+                      namespace: Optional[str] = None):
         """Upload a single vector to Pinecone index"""
-        index = self.get_index()
+        index = self.index
         try:
+            kwargs = {"namespace": namespace} if namespace else {}
+            vector = _rest_values(vector) if self._rest else _grpc_values(vector)
             return index.upsert(
-                vectors=[(str(id), vector, metadata)]
+                vectors=[(str(id), vector, metadata)],
+                **kwargs
             )
         except Exception as e:
             logger.error(f"Error upserting vector to Pinecone: {e}")
             raise
     
-    def upsert_vectors(self, vectors: List[tuple]):
+    def upsert_vectors(self, vectors: List[tuple], namespace: Optional[str] = None) -> int:
         """
         Upload vectors to Pinecone index
         Each vector should be a tuple of (id, vector, metadata)
+        
+        Returns:
+            Number of vectors upserted
+        """
+        return self.upsert_vectors_from_iter(vectors, namespace)
+    
+    def upsert_vectors_from_iter(self, vectors: Iterable[tuple],
+                                 namespace: Optional[str] = None,
+                                 batch_size: int = UPSERT_BATCH_SIZE) -> int:
+        """
+        Upload (id, vector, metadata) tuples from any iterable
+        
+        Vectors are sent in batches of batch_size, with up to
+        POOL_THREADS requests in flight; only those batches are held in
+        memory, so the input can be a generator over a database cursor.
+        
+        Returns:
+            Number of vectors upserted
         """
-        index = self.get_index()
+        kwargs = {"namespace": namespace} if namespace else {}
+        # IDs a texto (y valores redondeados si se envían por REST) según se van leyendo
+        wire = _rest_values if self._rest else _grpc_values
+        formatted = ((str(id), wire(vector), metadata) for id, vector, metadata in vectors)
+        
         try:
-            # Convert all IDs to strings
-            formatted_vectors = []
-            for id, vector, metadata in vectors:
-                formatted_vectors.append((str(id), vector, metadata))
-            
-            return index.upsert(vectors=formatted_vectors)
+            responses = self._send_in_batches(
+                lambda batch: _request_pool.submit(self.index.upsert, vectors=batch, **kwargs),
+                formatted, batch_size
+            )
+            return sum(response.upserted_count for response in responses)
         except Exception as e:
             logger.error(f"Error upserting vectors to Pinecone: {e}")
             raise
     
+    @staticmethod
+    def _send_in_batches(send: Callable[[list], Any], items: Iterable, batch_size: int) -> List[Any]:
+        """
+        Call send (which must return a future for the request) once per batch
+        of items, with at most POOL_THREADS requests in flight
+        
+        Returns:
+            The responses, in batch order
+        """
+        items = iter(items)
+        responses = []
+        pending = []
+        
+        def wait_oldest() -> None:
+            responses.append(pending.pop(0).result())
+        
+        while batch := list(islice(items, batch_size)):
+            pending.append(send(batch))
+            if len(pending) >= POOL_THREADS:
+                wait_oldest()
+        while pending:
+            wait_oldest()
+        return responses
+    
     def query_vector(self, 
                     vector: List[float], 
                     filter: Optional[Dict[str, Any]] = None,
                     top_k: int = 5, 
-                    include_metadata: bool = True):
+                    include_metadata: bool = True,
+                    namespace: Optional[str] = None):
         """Query the index with a vector"""
-        index = self.get_index()
+        index = self.index
         try:
+            kwargs = {"namespace": namespace} if namespace else {}
             return index.query(
                 vector=vector,
                 filter=filter,
                 top_k=top_k,
-                include_metadata=include_metadata
+                include_metadata=include_metadata,
+                **kwargs
             )
         except Exception as e:
             logger.error(f"Error querying Pinecone: {e}")
             raise
     
-    def delete_vector(self, id: Union[str, UUID]):
+    def delete_vector(self, id: Union[str, UUID], namespace: Optional[str] = None):
         """Delete a vector from the index"""
-        index = self.get_index()
+        index = self.index
         try:
-            return index.delete(ids=[str(id)])
+            kwargs = {"namespace": namespace} if namespace else {}
+            return index.delete(ids=[str(id)], **kwargs)
         except Exception as e:
             logger.error(f"Error deleting vector from Pinecone: {e}")
             raise
     
-    def delete_vectors(self, ids: List[Union[str, UUID]]):
-        """Delete vectors from the index"""
-        index = self.get_index()
+    def delete_vectors(self, ids: Iterable[Union[str, UUID]], namespace: Optional[str] = None):
+        """Delete vectors from the index, DELETE_BATCH_SIZE IDs per request"""
+        kwargs = {"namespace": namespace} if namespace else {}
         try:
-            # Convert all IDs to strings
-            string_ids = [str(id) for id in ids]
-            return index.delete(ids=string_ids)
+            # Convert IDs to strings as they are sent
+            string_ids = (str(id) for id in ids)
+            self._send_in_batches(
+                lambda batch: _request_pool.submit(self.index.delete, ids=batch, **kwargs),
+                string_ids, DELETE_BATCH_SIZE
+            )
         except Exception as e:
             logger.error(f"Error deleting vectors from Pinecone: {e}")
             raise
         
     def delete_by_metadata(self, filter: Dict[str, Any]):
         """Delete vectors matching a metadata filter"""
-        index = self.get_index()
+        index = self.index
         try:
             return index.delete(filter=filter)
         except Exception as e:
             logger.error(f"Error deleting vectors by metadata from Pinecone: {e}")
-            raise
\ No newline at end of file
+            raise
+
+@functools.lru_cache(maxsize=1)
+def get_pinecone_client() -> PineconeClient:
+    """Process-wide PineconeClient, so every caller shares one connection pool"""
+    return PineconeClient()
+
+
+class AsyncPineconeClient:
+    """
+    Async counterpart of PineconeClient for query and bulk upsert
+    
+    Requires pinecone[asyncio]. Create it inside the running event loop and
+    call close() when done.
+    """
+    
+    def __init__(self):
+        if PineconeAsyncio is None:
+            raise ImportError('AsyncPineconeClient requires pinecone[asyncio]')
+        self.api_key = settings.PINECONE_API_KEY
+        self.index_name = "finance-ai-index"
+        self.client = PineconeAsyncio(api_key=self.api_key)
+        self.index = None
+    
+    async def get_index(self):
+        """Get the index instance (resolves its host on first use)"""
+        if self.index is None:
+            description = await self.client.describe_index(self.index_name)
+            self.index = self.client.IndexAsyncio(host=description.host)
+        return self.index
+    
+    async def query_vector(self,
+                           vector: List[float],
+                           filter: Optional[Dict[str, Any]] = None,
+                           top_k: int = 5,
+                           include_metadata: bool = True,
+                           namespace: Optional[str] = None):
+        """Query the index with a vector"""
+        index = await self.get_index()
+        try:
+            kwargs = {"namespace": namespace} if namespace else {}
+            return await index.query(
+                vector=vector,
+                filter=filter,
+                top_k=top_k,
+                include_metadata=include_metadata,
+                **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Error querying Pinecone: {e}")
+            raise
+    
+    async def upsert_vectors(self, vectors: List[tuple],
+                             namespace: Optional[str] = None,
+                             batch_size: int = UPSERT_BATCH_SIZE) -> int:
+        """
+        Upload (id, vector, metadata) tuples in batches, up to
+        POOL_THREADS requests at once
+        
+        Returns:
+            Number of vectors upserted
+        """
+        index = await self.get_index()
+        kwargs = {"namespace": namespace} if namespace else {}
+        formatted = [(str(id), _rest_values(vector), metadata) for id, vector, metadata in vectors]
+        semaphore = asyncio.Semaphore(POOL_THREADS)
+        
+        async def upsert(batch: List[tuple]) -> int:
+            async with semaphore:
+                response = await index.upsert(vectors=batch, **kwargs)
+            return response.upserted_count
+        
+        try:
+            counts = await asyncio.gather(*(
+                upsert(formatted[i:i + batch_size]) for i in range(0, len(formatted), batch_size)
+            ))
+            return sum(counts)
+        except Exception as e:
+            logger.error(f"Error upserting vectors to Pinecone: {e}")
+            raise
+    
+    async def close(self):
+        """Close the underlying HTTP sessions"""
+        if self.index is not None:
+            await self.index.close()
+        await self.client.close()
@@ -1,73 +1,243 @@
-import os
+import asyncio
+import functools
+import json
+from itertools import islice
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union, Type
-from uuid import UUID
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from enum import Enum
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union, Type, Callable, TypeVar, Tuple, BinaryIO, get_args, get_origin
+from uuid import UUID, uuid5, NAMESPACE_URL
+import numpy as np
+from pydantic import BaseModel, TypeAdapter
+from supabase import create_client, acreate_client, Client, AsyncClient
+from config.settings import settings
 from config.logging import logger
+from utils.cache_utils import TTLCache
+
+# orjson (optional) decodes pgvector embeddings much faster than json
+try:
+    import orjson
+    from orjson import loads as _json_loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
 from .models import (
     Transaction, TransactionCreate, RecurringItem, RecurringItemCreate,
     Document, Projection, Category, SearchIndex
 )
 
-load_dotenv()
+# Columns needed by reports and analysis (no description or embedding)
+ANALYSIS_COLUMNS = "type,amount,category,date"
+# Listing columns: no embedding, metadata or tags (get_transaction returns the full row)
+TRANSACTION_LIST_COLUMNS = "id,type,amount,currency,description,category,date,payment_date,document_id"
+RECURRING_LIST_COLUMNS = "id,type,amount,currency,description,category,frequency,start_date,end_date,next_date"
+# Document without its extracted text or embedding
+DOCUMENT_COLUMNS = "id,name,type,file_path,extracted_data,transaction_id,metadata,created_at,updated_at"
+# Full transaction except the embedding (only the in-database vector search needs it)
+TRANSACTION_COLUMNS = ",".join(name for name in Transaction.model_fields if name != "embedding")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Namespace for the deterministic UUIDs of imported records
+_EXTERNAL_ID_NAMESPACE = uuid5(NAMESPACE_URL, "finance-mcp-agents")
+
+def external_record_id(source: str, external_id: str) -> UUID:
+    """
+    Deterministic UUID for a record coming from an external source
+    
+    The same (source, external_id) pair always maps to the same ID, so a
+    replayed webhook or retried import upserts the existing row.
+    """
+    return uuid5(_EXTERNAL_ID_NAMESPACE, f"{source}:{external_id}")
+
+# Converts the datetimes, UUIDs and enums of an update dict to JSON in one pass
+_UPDATE_ADAPTER = TypeAdapter(Dict[str, Any])
+
+@functools.lru_cache(maxsize=None)
+def _field_converters(model: Type[BaseModel]) -> Dict[str, Callable[[str], Any]]:
+    """Converters for the fields whose JSON value model_construct would leave as a string"""
+    converters = {}
+    for name, field in model.model_fields.items():
+        # Optional[X] -> X
+        types = [t for t in (get_args(field.annotation) or (field.annotation,)) if t is not type(None)]
+        if not types:
+            continue
+        field_type = types[0]
+        if get_origin(field_type) is list:
+            # pgvector returns embeddings as text '[0.1,0.2,...]'
+            converters[name] = _json_loads
+        elif not isinstance(field_type, type):
+            continue
+        elif field_type is datetime:
+            converters[name] = datetime.fromisoformat
+        elif issubclass(field_type, (Enum, UUID)):
+            converters[name] = field_type
+    return converters
+
+def _vector_literal(embedding: Union[List[float], np.ndarray]) -> str:
+    """
+    Encode an embedding as pgvector text ('[0.1,0.2,...]') at float32 precision
+    
+    pgvector stores float4 anyway; printing the shortest float32 form instead
+    of the float64 repr roughly halves the bytes sent per vector.
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    if orjson is not None:
+        return orjson.dumps(vector, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return "[" + ",".join(map(str, vector)) + "]"
+
+def _encode_vectors(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a list or array embedding in a row being written with its pgvector text"""
+    if isinstance(row.get("embedding"), (list, tuple, np.ndarray)):
+        row["embedding"] = _vector_literal(row["embedding"])
+    return row
+
+def _to_row(item: Union[BaseModel, Dict[str, Any]]) -> Dict[str, Any]:
+    """Row to insert for a model (dumped in JSON mode, unset fields left out) or a plain dict"""
+    return _encode_vectors(item.model_dump(mode="json", exclude_unset=True) if isinstance(item, BaseModel) else dict(item))
+
+def _row_to_model(model: Type[ModelT], row: Dict[str, Any]) -> ModelT:
+    """
+    Build a model from a database row without running validation
+    
+    Rows come from our own tables, so only the dates, enums, UUIDs and
+    vectors that arrive as JSON strings are converted; everything else is
+    used as is.
+    """
+    for name, convert in _field_converters(model).items():
+        value = row.get(name)
+        if type(value) is str:
+            row[name] = convert(value)
+    return model.model_construct(**row)
 
 class SupabaseClient:
+    # Categories rarely change: cached for 5 minutes per type
+    _categories_cache = TTLCache(maxsize=8, ttl=300)
+    
     def __init__(self):
         """Initialize Supabase client with credentials from environment"""
-        self.url = os.getenv("SUPABASE_URL")
-        self.key = os.getenv("SUPABASE_KEY")
+        self.url = settings.SUPABASE_URL
+        self.key = settings.SUPABASE_KEY
         self.client = create_client(self.url, self.key)
     
     def get_client(self):
         """Get the Supabase client instance"""
         return self.client
     
+    def _insert_many(self, table: str, model: Type[ModelT],
+                     items: List[Union[BaseModel, Dict[str, Any]]], batch_size: int = 50,
+                     upsert: bool = False) -> List[ModelT]:
+        """
+        Insert rows in batches of batch_size, one request per batch
+        
+        Models are dumped in JSON mode (datetimes and UUIDs as strings); fields
+        left unset take the column default instead of NULL. With upsert, rows
+        whose id already exists are updated instead.
+        """
+        rows = iter([_to_row(item) for item in items])
+        created = []
+        while batch := list(islice(rows, batch_size)):
+            if upsert:
+                request = self.client.table(table).upsert(batch, on_conflict="id", default_to_null=False)
+            else:
+                request = self.client.table(table).insert(batch, default_to_null=False)
+            response = request.execute()
+            created.extend(_row_to_model(model, row) for row in response.data)
+        return created
+    
     # Transactions
     def create_transaction(self, transaction: TransactionCreate) -> Transaction:
         """Insert a new transaction"""
         try:
-            data = transaction.model_dump(exclude_unset=True)
-            # Convert datetime objects to ISO format strings
-            for date_field in ["date", "payment_date"]:
-                if date_field in data and data[date_field] is not None:
-                    data[date_field] = data[date_field].isoformat()
-            
-            response = self.client.table("transactions").insert(data).execute()
+            created = self._insert_many("transactions", Transaction, [transaction])
             
-            if len(response.data) > 0:
-                return Transaction(**response.data[0])
+            if created:
+                return created[0]
             else:
-                logger.error(f"Error creating transaction: {response.error}")
-                raise Exception(f"Error creating transaction: {response.error}")
+                logger.error("Error creating transaction: no row returned")
+                raise Exception("Error creating transaction: no row returned")
         except Exception as e:
             logger.error(f"Exception when creating transaction: {e}")
             raise
     
+    def create_transactions_bulk(self, transactions: List[Union[TransactionCreate, Dict[str, Any]]],
+                                 batch_size: int = 50) -> List[Transaction]:
+        """Insert several transactions, one request per batch_size rows"""
+        try:
+            return self._insert_many("transactions", Transaction, transactions, batch_size)
+        except Exception as e:
+            logger.error(f"Exception when creating {len(transactions)} transactions: {e}")
+            raise
+    
+    def upsert_transaction(self, transaction_id: Union[str, UUID],
+                           transaction: TransactionCreate) -> Transaction:
+        """
+        Insert a transaction with the given ID, or update it if it already exists
+        
+        Use external_record_id() to derive the ID of imported transactions so
+        retries are idempotent.
+        """
+        try:
+            upserted = self.upsert_transactions_bulk([(transaction_id, transaction)])
+            
+            if upserted:
+                return upserted[0]
+            else:
+                logger.error("Error upserting transaction: no row returned")
+                raise Exception("Error upserting transaction: no row returned")
+        except Exception as e:
+            logger.error(f"Exception when upserting transaction {transaction_id}: {e}")
+            raise
+    
+    def upsert_transactions_bulk(self, transactions: List[Tuple[Union[str, UUID], TransactionCreate]],
+                                 batch_size: int = 500) -> List[Transaction]:
+        """
+        Insert or update several transactions, given as (id, transaction) tuples
+        
+        New and existing IDs can be mixed; each batch is a single request.
+        """
+        try:
+            rows = [
+                {"id": str(transaction_id), **transaction.model_dump(mode="json", exclude_unset=True)}
+                for transaction_id, transaction in transactions
+            ]
+            return self._insert_many("transactions", Transaction, rows, batch_size, upsert=True)
+        except Exception as e:
+            logger.error(f"Exception when upserting {len(transactions)} transactions: {e}")
+            raise
+    
     def get_transaction(self, transaction_id: Union[str, UUID]) -> Optional[Transaction]:
         """Get a transaction by ID"""
         try:
             response = self.client.table("transactions").select("*").eq("id", str(transaction_id)).execute()
             if len(response.data) > 0:
-                return Transaction(**response.data[0])
+                return _row_to_model(Transaction, response.data[0])
             return None
         except Exception as e:
             logger.error(f"Exception when getting transaction {transaction_id}: {e}")
             raise
     
+    def get_transactions_by_ids(self, transaction_ids: List[Union[str, UUID]]) -> List[Transaction]:
+        """Get several transactions by ID in a single request (without their embeddings)"""
+        if not transaction_ids:
+            return []
+        try:
+            ids = [str(transaction_id) for transaction_id in transaction_ids]
+            response = self.client.table("transactions").select(TRANSACTION_COLUMNS).in_("id", ids).execute()
+            return [_row_to_model(Transaction, item) for item in response.data]
+        except Exception as e:
+            logger.error(f"Exception when getting transactions {transaction_ids}: {e}")
+            raise
+    
     def update_transaction(self, transaction_id: Union[str, UUID], transaction_data: Dict[str, Any]) -> Transaction:
         """Update a transaction"""
         try:
-            # Convert datetime objects to ISO format strings
-            for date_field in ["date", "payment_date"]:
-                if date_field in transaction_data and transaction_data[date_field] is not None:
-                    if isinstance(transaction_data[date_field], datetime):
-                        transaction_data[date_field] = transaction_data[date_field].isoformat()
-            
-            response = self.client.table("transactions").update(transaction_data).eq("id", str(transaction_id)).execute()
+            # Encode the embedding (list or ndarray) before serializing the rest
+            data = _UPDATE_ADAPTER.dump_python(_encode_vectors(dict(transaction_data)), mode="json")
+            response = self.client.table("transactions").update(data).eq("id", str(transaction_id)).execute()
             
             if len(response.data) > 0:
-                return Transaction(**response.data[0])
+                return _row_to_model(Transaction, response.data[0])
             else:
                 logger.error(f"Error updating transaction: {response.error}")
                 raise Exception(f"Error updating transaction: {response.error}")
@@ -84,69 +254,167 @@ class SupabaseClient:
             logger.error(f"Exception when deleting transaction {transaction_id}: {e}")
             raise
     
-    def list_transactions(self, limit: int = 100, offset: int = 0, **filters) -> List[Transaction]:
-        """List transactions with optional filters"""
+    def _transactions_query(self, columns: str, limit: int, offset: int, filters: Dict[str, Any],
+                            cursor: Optional[tuple] = None):
+        """
+        Build the list query for transactions with optional filters
+        
+        Rows are ordered by (date, id) descending. With a cursor (the date and
+        id of the last row of the previous page) the page starts right after
+        it instead of skipping offset rows.
+        """
+        query = self.client.table("transactions").select(columns).order("date", desc=True).order("id", desc=True).limit(limit)
+        
+        if cursor is not None:
+            cursor_date, cursor_id = cursor
+            cursor_date = cursor_date.isoformat() if isinstance(cursor_date, datetime) else cursor_date
+            # Double quotes: the ISO date contains ':' and '+'
+            query = query.or_(f'date.lt."{cursor_date}",and(date.eq."{cursor_date}",id.lt.{cursor_id})')
+        elif offset:
+            query = query.offset(offset)
+        
+        # Apply filters if provided
+        for key, value in filters.items():
+            if key == "date_range" and isinstance(value, list) and len(value) == 2:
+                query = query.gte("date", value[0].isoformat() if isinstance(value[0], datetime) else value[0])
+                query = query.lte("date", value[1].isoformat() if isinstance(value[1], datetime) else value[1])
+            elif key == "category":
+                query = query.eq("category", value)
+            elif key == "type":
+                query = query.eq("type", value)
+            elif key == "search" and value:
+                # Full text search in description
+                query = query.ilike("description", f"%{value}%")
+            # Add more filter options as needed
+        
+        return query
+    
+    def list_transactions(self, limit: int = 100, offset: int = 0,
+                          cursor: Optional[tuple] = None, **filters) -> List[Transaction]:
+        """
+        List transactions with optional filters
+        
+        Only TRANSACTION_LIST_COLUMNS are fetched; use get_transaction for the
+        full record. For deep pages pass cursor=(date, id) of the last
+        transaction of the previous page instead of an offset.
+        """
         try:
-            query = self.client.table("transactions").select("*").order("date", desc=True).limit(limit).offset(offset)
+            response = self._transactions_query(TRANSACTION_LIST_COLUMNS, limit, offset, filters, cursor).execute()
             
-            # Apply filters if provided
-            for key, value in filters.items():
-                if key == "date_range" and isinstance(value, list) and len(value) == 2:
-                    query = query.gte("date", value[0].isoformat() if isinstance(value[0], datetime) else value[0])
-                    query = query.lte("date", value[1].isoformat() if isinstance(value[1], datetime) else value[1])
-                elif key == "category":
-                    query = query.eq("category", value)
-                elif key == "type":
-                    query = query.eq("type", value)
-                elif key == "search" and value:
-                    # Full text search in description
-                    query = query.ilike("description", f"%{value}%")
-                # Add more filter options as needed
-                
-            response = query.execute()
-            
-            return [Transaction(**item) for item in response.data]
+            return [_row_to_model(Transaction, item) for item in response.data]
         except Exception as e:
             logger.error(f"Exception when listing transactions: {e}")
             raise
     
+    def transaction_totals(self, date_from: datetime, date_to: datetime) -> List[Dict[str, Any]]:
+        """
+        Total amount and count of transactions per (type, category) in a period
+        
+        Runs the transaction_summary database function (see create_tables.py),
+        so only one row per type and category is transferred.
+        
+        Returns:
+            Rows with type, category, total and n
+        """
+        try:
+            params = {"date_from": date_from.isoformat(), "date_to": date_to.isoformat()}
+            return self.client.rpc("transaction_summary", params).execute().data
+        except Exception as e:
+            logger.error(f"Exception when summarizing transactions: {e}")
+            raise
+    
+    def monthly_transaction_totals(self, date_from: datetime, date_to: datetime) -> List[Dict[str, Any]]:
+        """
+        Total amount of transactions per (month, type) in a period
+        
+        Runs the transaction_monthly_totals database function (see create_tables.py).
+        
+        Returns:
+            Rows with month ('YYYY-MM', UTC), type and total
+        """
+        try:
+            params = {"date_from": date_from.isoformat(), "date_to": date_to.isoformat()}
+            return self.client.rpc("transaction_monthly_totals", params).execute().data
+        except Exception as e:
+            logger.error(f"Exception when summarizing transactions by month: {e}")
+            raise
+    
+    def sum_by_type(self) -> Dict[str, float]:
+        """Sum transaction amounts per type on the database side"""
+        try:
+            sql = """
+            SELECT type, SUM(amount) AS total
+            FROM transactions
+            GROUP BY type
+            """
+            
+            response = self.client.postgrest.rpc("execute_sql", {"sql": sql}).execute()
+            
+            return {row["type"]: float(row["total"] or 0) for row in response.data}
+        except Exception as e:
+            logger.error(f"Exception when summing transactions by type: {e}")
+            raise
+    
     # Recurring Items
     def create_recurring_item(self, item: RecurringItemCreate) -> RecurringItem:
         """Insert a new recurring item"""
         try:
-            data = item.model_dump(exclude_unset=True)
+            created = self._insert_many("recurring_items", RecurringItem, [item])
             
-            # Convert datetime objects to ISO format strings
-            for key, value in data.items():
-                if isinstance(value, UUID):
-                    data[key] = str(value)
-            
-            response = self.client.table("recurring_items").insert(data).execute()
-            
-            if len(response.data) > 0:
-                return RecurringItem(**response.data[0])
+            if created:
+                return created[0]
             else:
-                logger.error(f"Error creating recurring item: {response.error}")
-                raise Exception(f"Error creating recurring item: {response.error}")
+                logger.error("Error creating recurring item: no row returned")
+                raise Exception("Error creating recurring item: no row returned")
         except Exception as e:
             logger.error(f"Exception when creating recurring item: {e}")
             raise
     
+    def create_recurring_items_bulk(self, items: List[RecurringItemCreate],
+                                    batch_size: int = 50) -> List[RecurringItem]:
+        """Insert several recurring items, one request per batch_size rows"""
+        try:
+            return self._insert_many("recurring_items", RecurringItem, items, batch_size)
+        except Exception as e:
+            logger.error(f"Exception when creating {len(items)} recurring items: {e}")
+            raise
+    
+    def update_recurring_next_dates(self, updates: List[Tuple[Union[str, UUID], datetime]]) -> int:
+        """
+        Set the next_date of several recurring items in a single request
+        
+        Args:
+            updates: List of (item_id, next_date) tuples
+            
+        Returns:
+            Number of items updated
+        """
+        try:
+            payload = [
+                {"id": str(item_id), "next_date": next_date.isoformat()}
+                for item_id, next_date in updates
+            ]
+            response = self.client.rpc("update_recurring_next_dates", {"updates": payload}).execute()
+            return response.data
+        except Exception as e:
+            logger.error(f"Exception when updating {len(updates)} recurring next dates: {e}")
+            raise
+    
     def get_recurring_item(self, item_id: Union[str, UUID]) -> Optional[RecurringItem]:
         """Get a recurring item by ID"""
         try:
             response = self.client.table("recurring_items").select("*").eq("id", str(item_id)).execute()
             if len(response.data) > 0:
-                return RecurringItem(**response.data[0])
+                return _row_to_model(RecurringItem, response.data[0])
             return None
         except Exception as e:
             logger.error(f"Exception when getting recurring item {item_id}: {e}")
             raise
     
     def list_recurring_items(self, limit: int = 100, offset: int = 0, **filters) -> List[RecurringItem]:
-        """List recurring items with optional filters"""
+        """List recurring items with optional filters (RECURRING_LIST_COLUMNS only)"""
         try:
-            query = self.client.table("recurring_items").select("*").order("next_date", desc=False).limit(limit).offset(offset)
+            query = self.client.table("recurring_items").select(RECURRING_LIST_COLUMNS).order("next_date", desc=False).limit(limit).offset(offset)
             
             # Apply filters
             for key, value in filters.items():
@@ -156,6 +424,9 @@ class SupabaseClient:
                     query = query.eq("category", value)
                 elif key == "frequency":
                     query = query.eq("frequency", value)
+                elif key == "next_date_max":
+                    # Only items due on or before this date
+                    query = query.lte("next_date", value.isoformat() if isinstance(value, datetime) else value)
                 elif key == "active":
                     if value:
                         # Only active items (end_date is null or in the future)
@@ -166,34 +437,58 @@ class SupabaseClient:
             
             response = query.execute()
             
-            return [RecurringItem(**item) for item in response.data]
+            return [_row_to_model(RecurringItem, item) for item in response.data]
         except Exception as e:
             logger.error(f"Exception when listing recurring items: {e}")
             raise
     
+    # Projections
+    def create_projection(self, projection: Union[Projection, Dict[str, Any]]) -> Projection:
+        """Insert a new projection"""
+        try:
+            created = self._insert_many("projections", Projection, [projection])
+            
+            if created:
+                return created[0]
+            else:
+                logger.error("Error creating projection: no row returned")
+                raise Exception("Error creating projection: no row returned")
+        except Exception as e:
+            logger.error(f"Exception when creating projection: {e}")
+            raise
+    
     # Documents
-    def create_document(self, document: Document) -> Document:
+    def create_document(self, document: Union[Document, Dict[str, Any]]) -> Document:
         """Insert a new document"""
         try:
-            data = document.model_dump(exclude_unset=True)
-            response = self.client.table("documents").insert(data).execute()
+            created = self._insert_many("documents", Document, [document])
             
-            if len(response.data) > 0:
-                return Document(**response.data[0])
+            if created:
+                return created[0]
             else:
-                logger.error(f"Error creating document: {response.error}")
-                raise Exception(f"Error creating document: {response.error}")
+                logger.error("Error creating document: no row returned")
+                raise Exception("Error creating document: no row returned")
         except Exception as e:
             logger.error(f"Exception when creating document: {e}")
             raise
     
+    def create_documents_bulk(self, documents: List[Union[Document, Dict[str, Any]]],
+                              batch_size: int = 50) -> List[Document]:
+        """Insert several documents, one request per batch_size rows"""
+        try:
+            return self._insert_many("documents", Document, documents, batch_size)
+        except Exception as e:
+            logger.error(f"Exception when creating {len(documents)} documents: {e}")
+            raise
+    
     def update_document(self, document_id: Union[str, UUID], data: Dict[str, Any]) -> Document:
         """Update a document"""
         try:
+            data = _UPDATE_ADAPTER.dump_python(_encode_vectors(dict(data)), mode="json")
             response = self.client.table("documents").update(data).eq("id", str(document_id)).execute()
             
             if len(response.data) > 0:
-                return Document(**response.data[0])
+                return _row_to_model(Document, response.data[0])
             else:
                 logger.error(f"Error updating document: {response.error}")
                 raise Exception(f"Error updating document: {response.error}")
@@ -201,20 +496,37 @@ class SupabaseClient:
             logger.error(f"Exception when updating document {document_id}: {e}")
             raise
     
-    def get_document(self, document_id: Union[str, UUID]) -> Optional[Document]:
-        """Get a document by ID"""
+    def get_document(self, document_id: Union[str, UUID], include_content: bool = False) -> Optional[Document]:
+        """Get a document by ID (content_text and embedding only with include_content)"""
         try:
-            response = self.client.table("documents").select("*").eq("id", str(document_id)).execute()
+            columns = "*" if include_content else DOCUMENT_COLUMNS
+            response = self.client.table("documents").select(columns).eq("id", str(document_id)).execute()
             if len(response.data) > 0:
-                return Document(**response.data[0])
+                return _row_to_model(Document, response.data[0])
             return None
         except Exception as e:
             logger.error(f"Exception when getting document {document_id}: {e}")
             raise
     
+    def get_documents_by_ids(self, document_ids: List[Union[str, UUID]]) -> List[Document]:
+        """Get several documents by ID in a single request"""
+        if not document_ids:
+            return []
+        try:
+            ids = [str(document_id) for document_id in document_ids]
+            response = self.client.table("documents").select("*").in_("id", ids).execute()
+            return [_row_to_model(Document, item) for item in response.data]
+        except Exception as e:
+            logger.error(f"Exception when getting documents {document_ids}: {e}")
+            raise
+    
     # Categories
     def list_categories(self, type: Optional[str] = None) -> List[Category]:
-        """List categories with optional type filter"""
+        """List categories with optional type filter (cached for a few minutes)"""
+        cached = self._categories_cache.get(type)
+        if cached is not None:
+            return list(cached)
+        
         try:
             query = self.client.table("categories").select("*").order("name")
             
@@ -223,36 +535,105 @@ class SupabaseClient:
             
             response = query.execute()
             
-            return [Category(**item) for item in response.data]
+            categories = [_row_to_model(Category, item) for item in response.data]
+            self._categories_cache.set(type, tuple(categories))
+            return categories
         except Exception as e:
             logger.error(f"Exception when listing categories: {e}")
             raise
     
-    # Search Index
-    def search_text(self, query: str, reference_type: Optional[str] = None, limit: int = 10) -> List[SearchIndex]:
-        """Search for content using text search"""
+    def category_names(self, type: Optional[str] = None) -> frozenset:
+        """Names of the categories for a type, for O(1) membership checks"""
+        return frozenset(category.name for category in self.list_categories(type))
+    
+    @classmethod
+    def invalidate_categories_cache(cls) -> None:
+        """Drop cached categories (call after writing to the categories table)"""
+        cls._categories_cache.invalidate()
+    
+    def create_category(self, category: Category) -> Category:
+        """Insert a new category"""
         try:
-            sql = f"""
-            SELECT * 
-            FROM search_index 
-            WHERE to_tsvector('spanish', content) @@ plainto_tsquery('spanish', '{query}')
-            """
-            
-            if reference_type:
-                sql += f" AND reference_type = '{reference_type}'"
+            created = self._insert_many("categories", Category, [category])
+            self.invalidate_categories_cache()
             
-            sql += f" LIMIT {limit}"
+            if created:
+                return created[0]
+            else:
+                logger.error("Error creating category: no row returned")
+                raise Exception("Error creating category: no row returned")
+        except Exception as e:
+            logger.error(f"Exception when creating category: {e}")
+            raise
+    
+    def update_category(self, category_id: Union[str, UUID], category_data: Dict[str, Any]) -> Category:
+        """Update a category"""
+        try:
+            data = _UPDATE_ADAPTER.dump_python(category_data, mode="json")
+            response = self.client.table("categories").update(data).eq("id", str(category_id)).execute()
+            self.invalidate_categories_cache()
             
-            response = self.client.postgrest.rpc("execute_sql", {"sql": sql}).execute()
+            if len(response.data) > 0:
+                return _row_to_model(Category, response.data[0])
+            else:
+                logger.error(f"Error updating category {category_id}: no row returned")
+                raise Exception(f"Error updating category {category_id}: no row returned")
+        except Exception as e:
+            logger.error(f"Exception when updating category {category_id}: {e}")
+            raise
+    
+    def delete_category(self, category_id: Union[str, UUID]) -> bool:
+        """Delete a category"""
+        try:
+            response = self.client.table("categories").delete().eq("id", str(category_id)).execute()
+            self.invalidate_categories_cache()
+            return len(response.data) > 0
+        except Exception as e:
+            logger.error(f"Exception when deleting category {category_id}: {e}")
+            raise
+    
+    # Search Index
+    def search_text(self, query: str, reference_type: Optional[str] = None, limit: int = 10,
+                    **filters) -> List[SearchIndex]:
+        """
+        Search for content using text search
+        
+        Runs the search_content database function (see create_tables.py), so
+        the query is sent as a parameter and its plan is reused. Transaction
+        filters (type, category, date_range) are applied in the database by
+        joining the referenced transactions.
+        """
+        try:
+            params = self._search_text_params(query, reference_type, limit, filters)
+            response = self.client.rpc("search_content", params).execute()
             
-            return [SearchIndex(**item) for item in response.data]
+            return [_row_to_model(SearchIndex, item) for item in response.data]
         except Exception as e:
             logger.error(f"Exception when searching text {query}: {e}")
             raise
     
+    @staticmethod
+    def _search_text_params(query: str, reference_type: Optional[str], limit: int,
+                            filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments of the search_content database function"""
+        params = {"q": query, "ref_type": reference_type, "lim": limit}
+        for key, value in filters.items():
+            if key == "date_range" and isinstance(value, (list, tuple)) and len(value) == 2:
+                params["date_from"] = value[0].isoformat() if isinstance(value[0], datetime) else value[0]
+                params["date_to"] = value[1].isoformat() if isinstance(value[1], datetime) else value[1]
+            elif key in ("type", "category") and value is not None:
+                params[f"tx_{key}"] = str(getattr(value, "value", value))
+        return params
+    
     # Storage operations for document uploads
-    def upload_file(self, bucket_name: str, file_path: str, file_data: bytes) -> str:
-        """Upload a file to Supabase Storage"""
+    def upload_file(self, bucket_name: str, file_path: str,
+                    file_data: Union[bytes, BinaryIO, str, Path]) -> str:
+        """
+        Upload a file to Supabase Storage
+        
+        file_data can be the content, a file opened in binary mode or a local
+        path; files and paths are streamed instead of loaded into memory.
+        """
         try:
             response = self.client.storage.from_(bucket_name).upload(file_path, file_data)
             return self.client.storage.from_(bucket_name).get_public_url(file_path)
@@ -266,4 +647,98 @@ class SupabaseClient:
             return self.client.storage.from_(bucket_name).download(file_path)
         except Exception as e:
             logger.error(f"Exception when downloading file {file_path}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+@functools.lru_cache(maxsize=1)
+def get_supabase_client() -> SupabaseClient:
+    """Process-wide SupabaseClient, so every caller shares one HTTP connection pool"""
+    return SupabaseClient()
+
+
+class AsyncSupabaseClient:
+    """
+    Async counterpart of SupabaseClient for the hot read/write paths
+    
+    Lets callers running an event loop overlap independent requests with
+    asyncio.gather instead of blocking a thread per call. Build it with
+    `await AsyncSupabaseClient.create()`.
+    """
+    
+    # Bulk insert batches in flight at once
+    MAX_CONCURRENT_BATCHES = 10
+    
+    # Query and parameter building are shared with the sync client
+    _transactions_query = SupabaseClient._transactions_query
+    _search_text_params = staticmethod(SupabaseClient._search_text_params)
+    
+    def __init__(self, client: AsyncClient):
+        self.client = client
+    
+    @classmethod
+    async def create(cls) -> "AsyncSupabaseClient":
+        """Connect with the credentials from the environment"""
+        return cls(await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_KEY))
+    
+    async def get_transaction(self, transaction_id: Union[str, UUID]) -> Optional[Transaction]:
+        """Get a transaction by ID"""
+        try:
+            response = await self.client.table("transactions").select("*").eq("id", str(transaction_id)).execute()
+            if len(response.data) > 0:
+                return _row_to_model(Transaction, response.data[0])
+            return None
+        except Exception as e:
+            logger.error(f"Exception when getting transaction {transaction_id}: {e}")
+            raise
+    
+    async def get_transactions_by_ids(self, transaction_ids: List[Union[str, UUID]]) -> List[Transaction]:
+        """Get several transactions by ID in a single request (without their embeddings)"""
+        if not transaction_ids:
+            return []
+        try:
+            ids = [str(transaction_id) for transaction_id in transaction_ids]
+            response = await self.client.table("transactions").select(TRANSACTION_COLUMNS).in_("id", ids).execute()
+            return [_row_to_model(Transaction, item) for item in response.data]
+        except Exception as e:
+            logger.error(f"Exception when getting transactions {transaction_ids}: {e}")
+            raise
+    
+    async def list_transactions(self, limit: int = 100, offset: int = 0,
+                                cursor: Optional[tuple] = None, **filters) -> List[Transaction]:
+        """List transactions with optional filters (same filters as SupabaseClient)"""
+        try:
+            response = await self._transactions_query(TRANSACTION_LIST_COLUMNS, limit, offset, filters, cursor).execute()
+            return [_row_to_model(Transaction, item) for item in response.data]
+        except Exception as e:
+            logger.error(f"Exception when listing transactions: {e}")
+            raise
+    
+    async def create_transactions_bulk(self, transactions: List[Union[TransactionCreate, Dict[str, Any]]],
+                                       batch_size: int = 50) -> List[Transaction]:
+        """Insert several transactions, sending up to MAX_CONCURRENT_BATCHES batches at once"""
+        rows = [_to_row(t) for t in transactions]
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+        
+        async def insert(batch: List[Dict[str, Any]]) -> List[Transaction]:
+            async with semaphore:
+                response = await self.client.table("transactions").insert(batch, default_to_null=False).execute()
+            return [_row_to_model(Transaction, row) for row in response.data]
+        
+        try:
+            batches = await asyncio.gather(*(
+                insert(rows[i:i + batch_size]) for i in range(0, len(rows), batch_size)
+            ))
+            return [transaction for batch in batches for transaction in batch]
+        except Exception as e:
+            logger.error(f"Exception when creating {len(transactions)} transactions: {e}")
+            raise
+    
+    async def search_text(self, query: str, reference_type: Optional[str] = None, limit: int = 10,
+                          **filters) -> List[SearchIndex]:
+        """Search for content using text search (see SupabaseClient.search_text)"""
+        try:
+            params = self._search_text_params(query, reference_type, limit, filters)
+            response = await self.client.rpc("search_content", params).execute()
+            return [_row_to_model(SearchIndex, item) for item in response.data]
+        except Exception as e:
+            logger.error(f"Exception when searching text {query}: {e}")
+            raise
@@ -1,95 +1,176 @@
-from typing import Dict, Any, List, Optional, Union, BinaryIO
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union, BinaryIO, Tuple
 from uuid import UUID
 
-from data.models import Document, DocumentType
-from data.supabase_client import SupabaseClient
-from data.pinecone_client import PineconeClient
+from data.models import Document, DocumentType, TransactionCreate
+from data.supabase_client import get_supabase_client
+from data.pinecone_client import get_pinecone_client
 from core.document_processor import DocumentProcessor
-from core.ai_engine import AIEngine
-from utils.embedding_utils import generate_embedding
+from core.ai_engine import get_ai_engine
+from core.search_engine import SearchEngine, get_search_engine
+from utils.embedding_utils import generate_embedding_array
 from config.logging import logger
 
+# Storage uploads and Pinecone upserts run here, overlapping with extraction and inserts
+_io_pool = ThreadPoolExecutor(max_workers=4)
+
+# Keywords for _guess_category, in priority order; one compiled alternation per category
+_EXPENSE_CATEGORY_PATTERNS = [
+    (category, re.compile("|".join(map(re.escape, terms))))
+    for category, terms in [
+        ("Software", ["hosting", "server", "cloud", "aws", "azure", "domain"]),
+        ("Payroll", ["salary", "compensation", "bonus", "payroll"]),
+        ("Marketing", ["ad", "marketing", "promotion", "campaign"]),
+        ("Office", ["office", "supplies", "furniture", "rent"]),
+        ("Legal", ["legal", "lawyer", "attorney", "compliance"]),
+        ("Taxes", ["tax", "taxes", "duty", "vat", "iva"]),
+    ]
+]
+
+# Extracted fields copied into the Pinecone metadata of a document
+_PINECONE_METADATA_KEYS = ("issuer", "date", "total_amount", "currency")
+
+def _pinecone_metadata(name: str, document_type: str, extracted_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Metadata stored with a document's vector in Pinecone"""
+    extracted_data = extracted_data or {}
+    return {
+        "name": name,
+        "type": document_type,
+        "extracted_data": {k: str(extracted_data[k]) for k in _PINECONE_METADATA_KEYS if k in extracted_data},
+        "reference_type": "document"
+    }
+
+def _content_hash(text: Optional[str]) -> str:
+    """SHA-256 of a document's text with whitespace collapsed (stored in its metadata)"""
+    return hashlib.sha256(" ".join((text or "").split()).encode("utf-8")).hexdigest()
+
+def _local_path(file_obj: BinaryIO) -> Optional[str]:
+    """Path of file_obj when it is a file opened from disk, so it can be streamed from there"""
+    name = getattr(file_obj, "name", None)
+    if isinstance(file_obj, (io.BufferedReader, io.FileIO)) and isinstance(name, str) and os.path.isfile(name):
+        return name
+    return None
+
 class DocumentService:
     def __init__(self):
-        self.supabase = SupabaseClient()
-        self.pinecone = PineconeClient()
-        self.ai_engine = AIEngine()
+        self.supabase = get_supabase_client()
+        self.pinecone = get_pinecone_client()
+        self.ai_engine = get_ai_engine()
         self.document_processor = DocumentProcessor(self.ai_engine)
+        self.search_engine = get_search_engine()
     
     def process_document(self, file_obj: BinaryIO, filename: str) -> Dict[str, Any]:
         """Process a document file and extract information"""
+        return self.process_documents([(file_obj, filename)])[0]
+    
+    def process_documents(self, files: List[Tuple[BinaryIO, str]]) -> List[Dict[str, Any]]:
+        """
+        Process several document files, storing them with one batched insert
+        and one batched Pinecone upsert
+        
+        Args:
+            files: List of (file_obj, filename) tuples
+            
+        Returns:
+            One result per file, in the same order as the input
+        """
         try:
-            # Process document using the document processor
-            result = self.document_processor.process_document(file_obj, filename)
+            # Files on disk are streamed to Storage from their path; anything
+            # else is read once and the bytes feed both the upload and the extraction
+            sources = []
+            inputs = []
+            for file_obj, filename in files:
+                path = _local_path(file_obj)
+                if path:
+                    sources.append(path)
+                    inputs.append((file_obj, filename))
+                else:
+                    content = file_obj.read()
+                    sources.append(content)
+                    inputs.append((io.BytesIO(content), filename))
             
-            if not result.get("success", False):
-                return result
+            # Store the files in Supabase Storage while they are being processed
+            uploads = [
+                _io_pool.submit(self.supabase.upload_file, "documents", f"documents/{filename}", source)
+                for (_, filename), source in zip(files, sources)
+            ]
             
-            # Store the file in Supabase Storage
-            file_path = f"documents/{filename}"
-            file_obj.seek(0)  # Reset file pointer to beginning
-            public_url = self.supabase.upload_file("documents", file_path, file_obj.read())
-            
-            # Create document record in database
-            document_data = {
-                "name": filename,
-                "type": result["document_type"],
-                "file_path": file_path,
-                "content_text": result["content_text"],
-                "extracted_data": result["extracted_data"],
-                "embedding": result["embedding"],
-                "metadata": {
-                    "public_url": public_url,
-                    "processed_at": result.get("processed_at", None)
-                }
-            }
-            
-            # Create document in Supabase
-            document = self.supabase.create_document(document_data)
-            
-            # Store embedding in Pinecone
-            metadata = {
-                "name": filename,
-                "type": result["document_type"],
-                "extracted_data": {k: str(v) for k, v in result["extracted_data"].items() if k in ["issuer", "date", "total_amount", "currency"]},
-                "reference_type": "document"
-            }
-            
-            self.pinecone.upsert_vector(
-                id=document.id,
-                vector=result["embedding"],
-                metadata=metadata
-            )
+            # Extract text and data concurrently, embeddings in a single batch
+            results = self.document_processor.process_documents(inputs)
+            
+            processed = []
+            for (_, filename), result, upload in zip(files, results, uploads):
+                if not result.get("success", False):
+                    continue
+                
+                file_path = f"documents/{filename}"
+                public_url = upload.result()
+                
+                processed.append((filename, result, {
+                    "name": filename,
+                    "type": result["document_type"],
+                    "file_path": file_path,
+                    "content_text": result["content_text"],
+                    "extracted_data": result["extracted_data"],
+                    "embedding": result["embedding"],
+                    "metadata": {
+                        "public_url": public_url,
+                        "processed_at": result.get("processed_at", None),
+                        "content_sha256": _content_hash(result["content_text"])
+                    }
+                }))
+            
+            if not processed:
+                return results
+            
+            # Create all document records in one request per batch
+            documents = self.supabase.create_documents_bulk([row for _, _, row in processed])
+            
+            # Store all embeddings in Pinecone in batched upserts, while the transactions are created
+            vectors_upserted = _io_pool.submit(self.pinecone.upsert_vectors, [
+                (document.id, result["embedding"],
+                 _pinecone_metadata(filename, result["document_type"], result["extracted_data"]))
+                for document, (filename, result, _) in zip(documents, processed)
+            ])
             
-            # Check if we should create a transaction from this document
-            transaction_id = None
-            if result["document_type"] in ["invoice", "receipt"]:
-                # Create transaction from document
-                transaction_id = self._create_transaction_from_document(document, result["extracted_data"])
+            for document, (filename, result, _) in zip(documents, processed):
+                # Check if we should create a transaction from this document
+                transaction_id = None
+                if result["document_type"] in ["invoice", "receipt"]:
+                    # Create transaction from document
+                    transaction_id = self._create_transaction_from_document(document, result["extracted_data"])
+                    
+                    if transaction_id:
+                        # Update document with transaction reference
+                        self.supabase.update_document(document.id, {"transaction_id": transaction_id})
                 
-                if transaction_id:
-                    # Update document with transaction reference
-                    self.supabase.update_document(document.id, {"transaction_id": transaction_id})
-            
-            return {
-                "success": True,
-                "document": document,
-                "transaction_id": transaction_id,
-                "message": f"Successfully processed document: {filename}"
-            }
+                # Replace the extraction result in place so the output keeps the input order
+                result.clear()
+                result.update({
+                    "success": True,
+                    "document": document,
+                    "transaction_id": transaction_id,
+                    "message": f"Successfully processed document: {filename}"
+                })
+            
+            vectors_upserted.result()
+            SearchEngine.invalidate_cache()
+            
+            return results
         
         except Exception as e:
-            logger.error(f"Error processing document: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            logger.error(f"Error processing documents: {e}")
+            return [{"success": False, "error": str(e)} for _ in files]
     
     def _create_transaction_from_document(self, document: Document, extracted_data: Dict[str, Any]) -> Optional[UUID]:
         """Create a transaction from document data"""
         try:
-            from services.transaction_service import TransactionService
-            transaction_service = TransactionService()
+            from services.transaction_service import get_transaction_service
+            transaction_service = get_transaction_service()
             
             # Determine transaction type (receipts are expenses, invoices might be either)
             transaction_type = "expense"
@@ -97,22 +178,22 @@ class DocumentService:
                 transaction_type = "income"
                 
             # Prepare transaction data
-            transaction_data = {
-                "type": transaction_type,
-                "amount": extracted_data.get("total_amount", 0),
-                "currency": extracted_data.get("currency", "USD"),
-                "description": f"{extracted_data.get('issuer', 'Unknown')} - {document.name}",
-                "category": self._guess_category(extracted_data, transaction_type),
-                "date": extracted_data.get("date", None),
-                "payment_date": extracted_data.get("payment_date", None),
-                "document_id": str(document.id),
-                "metadata": {
+            transaction_data = TransactionCreate(
+                type=transaction_type,
+                amount=extracted_data.get("total_amount", 0),
+                currency=extracted_data.get("currency", "USD"),
+                description=f"{extracted_data.get('issuer', 'Unknown')} - {document.name}",
+                category=self._guess_category(extracted_data, transaction_type),
+                date=extracted_data.get("date", None),
+                payment_date=extracted_data.get("payment_date", None),
+                document_id=document.id,
+                metadata={
                     "document_reference": str(document.id),
                     "document_type": document.type,
                     "reference_number": extracted_data.get("reference_number", None),
                     "items": extracted_data.get("items", [])
                 }
-            }
+            )
             
             # Create the transaction
             transaction = transaction_service.create(transaction_data)
@@ -125,57 +206,65 @@ class DocumentService:
     def _guess_category(self, extracted_data: Dict[str, Any], transaction_type: str) -> str:
         """Guess an appropriate category based on document data"""
         # This is a simplified implementation, could be improved with more sophisticated logic
-        description = extracted_data.get("description", "").lower()
-        issuer = extracted_data.get("issuer", "").lower()
-        
         if transaction_type == "income":
             return "Revenue"
         
+        description = extracted_data.get("description") or ""
+        issuer = extracted_data.get("issuer") or ""
+        
+        # Nothing to match (common with poor OCR)
+        if not description and not issuer:
+            return "Other Expense"
+        
+        # Lowercase once; the newline keeps a keyword from spanning both fields
+        text = f"{description}\n{issuer}".lower()
+        
         # Try to guess expense category
-        if any(term in description or term in issuer for term in ["hosting", "server", "cloud", "aws", "azure", "domain"]):
-            return "Software"
-        elif any(term in description or term in issuer for term in ["salary", "compensation", "bonus", "payroll"]):
-            return "Payroll"
-        elif any(term in description or term in issuer for term in ["ad", "marketing", "promotion", "campaign"]):
-            return "Marketing"
-        elif any(term in description or term in issuer for term in ["office", "supplies", "furniture", "rent"]):
-            return "Office"
-        elif any(term in description or term in issuer for term in ["legal", "lawyer", "attorney", "compliance"]):
-            return "Legal"
-        elif any(term in description or term in issuer for term in ["tax", "taxes", "duty", "vat", "iva"]):
-            return "Taxes"
+        for category, pattern in _EXPENSE_CATEGORY_PATTERNS:
+            if pattern.search(text):
+                return category
         
         # Default
         return "Other Expense"
     
-    def get(self, document_id: Union[str, UUID]) -> Optional[Document]:
-        """Get a document by ID"""
-        return self.supabase.get_document(document_id)
+    def get(self, document_id: Union[str, UUID], include_content: bool = False) -> Optional[Document]:
+        """Get a document by ID (content_text and embedding only with include_content)"""
+        return self.supabase.get_document(document_id, include_content)
     
     def update(self, document_id: Union[str, UUID], data: Dict[str, Any]) -> Document:
-        """Update a document"""
+        """
+        Update a document
+        
+        A new content_text is compared with the content hash stored in the
+        document metadata. Whitespace-only edits hash the same, so they keep
+        the existing embedding (computed from the previous text) and skip the
+        Pinecone upsert. Documents without a stored hash are always re-embedded.
+        """
         try:
-            # Update document in Supabase
-            document = self.supabase.update_document(document_id, data)
+            embedding = None
             
             # If content_text changed, update embedding
             if "content_text" in data:
-                content_text = data["content_text"]
-                embedding = generate_embedding(content_text)
-                
-                # Update embedding in Supabase
-                self.supabase.update_document(document_id, {"embedding": embedding})
-                
-                # Get full document
-                full_doc = self.supabase.get_document(document_id)
+                content_text = data["content_text"] or ""
+                content_hash = _content_hash(content_text)
+                # Only the light columns: the hash lives in the metadata
+                current = self.supabase.get_document(document_id)
+                metadata = data.get("metadata") if "metadata" in data else (current.metadata if current else None)
                 
+                if current is None or (current.metadata or {}).get("content_sha256") != content_hash:
+                    embedding = generate_embedding_array(content_text)
+                    data = {
+                        **data,
+                        "embedding": embedding,
+                        "metadata": {**(metadata or {}), "content_sha256": content_hash}
+                    }
+            
+            # Update document (and its embedding) in Supabase in a single request
+            document = self.supabase.update_document(document_id, data)
+            
+            if embedding is not None:
                 # Update embedding in Pinecone
-                metadata = {
-                    "name": full_doc.name,
-                    "type": full_doc.type,
-                    "extracted_data": {} if not full_doc.extracted_data else {k: str(v) for k, v in full_doc.extracted_data.items() if k in ["issuer", "date", "total_amount", "currency"]},
-                    "reference_type": "document"
-                }
+                metadata = _pinecone_metadata(document.name, document.type, document.extracted_data)
                 
                 self.pinecone.upsert_vector(
                     id=document_id,
@@ -183,6 +272,8 @@ class DocumentService:
                     metadata=metadata
                 )
             
+            SearchEngine.invalidate_cache()
+            
             return document
         except Exception as e:
             logger.error(f"Error updating document: {e}")
@@ -204,6 +295,8 @@ class DocumentService:
                 # Delete from Pinecone
                 self.pinecone.delete_vector(document_id)
                 
+                SearchEngine.invalidate_cache()
+                
                 return result
             return False
         except Exception as e:
@@ -218,10 +311,7 @@ class DocumentService:
         """Search for documents similar to the query text"""
         try:
             # Use the search engine to search for documents
-            from core.search_engine import SearchEngine
-            search_engine = SearchEngine()
-            
-            return search_engine.search_documents(query, limit)
+            return self.search_engine.search_documents(query, limit)
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             return []
\ No newline at end of file
@@ -1,18 +1,42 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Union
 from uuid import UUID
-import json
 import pandas as pd
 import numpy as np
 
 from data.models import Projection
-from data.supabase_client import SupabaseClient
+from data.supabase_client import get_supabase_client
 from core.financial_analyzer import FinancialAnalyzer
 from config.logging import logger
 
+def _project_months(baseline_income: float, baseline_expenses: float,
+                    income_growth: float, expense_growth: float,
+                    income_adjustments: np.ndarray, expense_adjustments: np.ndarray,
+                    initial_balance: float) -> np.ndarray:
+    """
+    Project income, expenses, net and cash balance month by month
+    
+    Args:
+        baseline_income: Income of the latest month
+        baseline_expenses: Expenses of the latest month
+        income_growth: Monthly income growth factor (1.05 = +5%)
+        expense_growth: Monthly expense growth factor
+        income_adjustments: Extra income per projected month
+        expense_adjustments: Extra expenses per projected month
+        initial_balance: Cash balance before the first month
+        
+    Returns:
+        Array of shape (4, months) with the income, expenses, net and balance rows
+    """
+    periods = np.arange(len(income_adjustments), dtype=np.float64)
+    income = baseline_income * np.power(income_growth, periods) + income_adjustments
+    expenses = baseline_expenses * np.power(expense_growth, periods) + expense_adjustments
+    net = income - expenses
+    return np.stack([income, expenses, net, initial_balance + np.cumsum(net)])
+
 class ProjectionService:
     def __init__(self):
-        self.supabase = SupabaseClient()
+        self.supabase = get_supabase_client()
         self.financial_analyzer = FinancialAnalyzer()
     
     def create_projection(self, 
@@ -37,7 +61,9 @@ class ProjectionService:
         """
         try:
             start_date = datetime.now().replace(day=1)
-            end_date = start_date + timedelta(days=30 * months)
+            # One calendar month per projected month
+            projected_periods = pd.period_range(start=start_date, periods=months, freq='M')
+            end_date = (pd.Period(start_date, freq='M') + months).to_timestamp().to_pydatetime()
             
             # Get historical data for baseline
             runway_data = self.financial_analyzer.calculate_runway(months_back=3)
@@ -64,63 +90,55 @@ class ProjectionService:
                     "error": "Not enough historical data for projection"
                 }
             
-            # Generate projected months
-            projected_months = []
-            
             baseline_income = latest_month_data["income"]
             baseline_expenses = latest_month_data["expenses"]
             
-            for i in range(months):
-                month_date = start_date + timedelta(days=30 * i)
-                month_key = month_date.strftime('%Y-%m')
-                
-                # Apply growth rates
-                income_growth = 1 + (assumptions["growth_rate"] / 100)
-                expense_growth = 1 + (assumptions["expense_rate"] / 100)
-                
-                projected_income = baseline_income * (income_growth ** i)
-                projected_expenses = baseline_expenses * (expense_growth ** i)
-                
-                # Add new revenue streams for this month
-                if month_key in assumptions["new_revenue"]:
-                    for item in assumptions["new_revenue"][month_key]:
-                        projected_income += item["amount"]
-                
-                # Add new expense items for this month
-                if month_key in assumptions["new_expenses"]:
-                    for item in assumptions["new_expenses"][month_key]:
-                        projected_expenses += item["amount"]
-                
-                # Add one-time items
-                for item in assumptions["one_time_items"]:
-                    if item["month"] == month_key:
-                        if item["type"] == "income":
-                            projected_income += item["amount"]
-                        else:
-                            projected_expenses += item["amount"]
-                
-                projected_months.append({
-                    "month": month_key,
-                    "income": float(projected_income),
-                    "expenses": float(projected_expenses),
-                    "net": float(projected_income - projected_expenses)
-                })
+            month_keys = projected_periods.strftime('%Y-%m').tolist()
+            month_index = {month_key: i for i, month_key in enumerate(month_keys)}
+            
+            # Bucket new revenue streams and expense items by month
+            income_adjustments = np.zeros(months)
+            expense_adjustments = np.zeros(months)
+            for values, items_by_month in ((income_adjustments, assumptions["new_revenue"]),
+                                           (expense_adjustments, assumptions["new_expenses"])):
+                for month_key, items in items_by_month.items():
+                    if month_key in month_index:
+                        values[month_index[month_key]] += sum(item["amount"] for item in items)
+            
+            # Add one-time items
+            for item in assumptions["one_time_items"]:
+                i = month_index.get(item["month"])
+                if i is not None:
+                    if item["type"] == "income":
+                        income_adjustments[i] += item["amount"]
+                    else:
+                        expense_adjustments[i] += item["amount"]
             
-            # Calculate projected cash balance
             initial_balance = runway_data.get("cash_balance", 0)
-            running_balance = initial_balance
+            income, expenses, net, balance = _project_months(
+                baseline_income, baseline_expenses,
+                1 + (assumptions["growth_rate"] / 100), 1 + (assumptions["expense_rate"] / 100),
+                income_adjustments, expense_adjustments, initial_balance
+            )
             
-            for month in projected_months:
-                running_balance += month["net"]
-                month["balance"] = float(running_balance)
+            # Convert to Python values only at the output boundary
+            projected_months = [
+                {
+                    "month": month_key,
+                    "income": month_income,
+                    "expenses": month_expenses,
+                    "net": month_net,
+                    "balance": month_balance
+                }
+                for month_key, month_income, month_expenses, month_net, month_balance in zip(
+                    month_keys, income.tolist(), expenses.tolist(), net.tolist(), balance.tolist()
+                )
+            ]
             
             # Calculate runway
             last_balance = projected_months[-1]["balance"]
-            avg_burn = 0
-            burn_months = [m for m in projected_months if m["net"] < 0]
-            
-            if burn_months:
-                avg_burn = np.mean([abs(m["net"]) for m in burn_months])
+            burn = net[net < 0]
+            avg_burn = float(-burn.mean()) if burn.size else 0.0
             
             projected_runway = 0
             if avg_burn > 0:
@@ -136,9 +154,10 @@ class ProjectionService:
                 "data": {
                     "months": projected_months,
                     "initial_balance": float(initial_balance),
-                    "final_balance": float(last_balance),
-                    "avg_monthly_burn": float(avg_burn),
-                    "projected_runway": float(projected_runway)
+                    "final_balance": last_balance,
+                    "avg_monthly_burn": avg_burn,
+                    # JSON has no Infinity: an infinite runway is stored as null
+                    "projected_runway": None if projected_runway == float('inf') else float(projected_runway)
                 },
                 "assumptions": assumptions,
                 "created_by": "AI Financial Assistant"
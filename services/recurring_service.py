@@ -4,31 +4,32 @@ from uuid import UUID
 import json
 
 from data.models import RecurringItem, RecurringItemCreate, TransactionCreate, TransactionType, FrequencyType
-from data.supabase_client import SupabaseClient
+from data.supabase_client import get_supabase_client
 from config.logging import logger
 
+# Days per month in a non-leap year
+_MONTH_LENGTHS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def _add_months(current_date: datetime, months: int) -> datetime:
+    """Same day `months` months later, clamped to the length of the target month"""
+    year, month = divmod(current_date.month - 1 + months, 12)
+    year += current_date.year
+    month += 1
+    max_day = _MONTH_LENGTHS[month - 1] + (1 if month == 2 and _is_leap(year) else 0)
+    return current_date.replace(year=year, month=month, day=min(current_date.day, max_day))
+
 class RecurringService:
     def __init__(self):
-        self.supabase = SupabaseClient()
+        self.supabase = get_supabase_client()
     
     def create(self, data: Dict[str, Any]) -> RecurringItem:
         """Create a new recurring item"""
         try:
-            # Asegurar que todos los UUIDs se convierten a strings antes de pasarlos
-            for key, value in data.items():
-                if isinstance(value, UUID):
-                    data[key] = str(value)
-            # Prepare recurring item data
-            create_data = RecurringItemCreate(**data)
-            
-            # Ensure next_date is set
-            if not create_data.next_date:
-                create_data.next_date = create_data.start_date
-            
-            # Create recurring item in Supabase
-            recurring_item = self.supabase.create_recurring_item(create_data)
-            
-            return recurring_item
+            # Validate in one pass (next_date defaults to start_date in the model)
+            return self.supabase.create_recurring_item(RecurringItemCreate.model_validate(data))
         except Exception as e:
             logger.error(f"Error creating recurring item: {e}")
             raise
@@ -76,40 +77,36 @@ class RecurringService:
                 return {"processed": 0, "message": "No recurring items due"}
             
             # Import transaction service here to avoid circular imports
-            from services.transaction_service import TransactionService
-            transaction_service = TransactionService()
+            from services.transaction_service import get_transaction_service
+            transaction_service = get_transaction_service()
             
-            processed_count = 0
+            transactions = []
+            next_dates = []
             for item in due_items:
                 # Create a transaction for this recurring item
-                transaction_data = {
-                    "type": item.type.value,
-                    "amount": item.amount,
-                    "currency": item.currency,
-                    "description": item.description,
-                    "category": item.category,
-                    "date": item.next_date.isoformat(),
-                    "recurring_id": str(item.id),
-                    "metadata": {"generated_from_recurring": True}
-                }
+                transactions.append(TransactionCreate(
+                    type=item.type,
+                    amount=item.amount,
+                    currency=item.currency,
+                    description=item.description,
+                    category=item.category,
+                    date=item.next_date,
+                    recurring_id=item.id,
+                    metadata={"generated_from_recurring": True}
+                ))
                 
-                # Create the transaction
-                transaction_service.create(transaction_data)
-                
-                # Update the next_date for this recurring item
+                # Move next_date forward. Past the end_date this is the last
+                # occurrence: the item stops being due once end_date has passed
+                # (the active filter excludes it from then on)
                 next_date = self._calculate_next_date(item.next_date, item.frequency)
-                
-                # Check if this was the last occurrence (end_date reached)
-                is_last = item.end_date and next_date > item.end_date
-                
-                if is_last:
-                    # This was the last occurrence, mark as inactive
-                    self.update(item.id, {"is_active": False})
-                else:
-                    # Update next_date
-                    self.update(item.id, {"next_date": next_date.isoformat()})
-                
-                processed_count += 1
+                next_dates.append((item.id, next_date))
+            
+            # Create all the transactions with batched writes
+            transaction_service.create_many(transactions)
+            processed_count = len(transactions)
+            
+            # Write every new next_date back in a single request
+            self.supabase.update_recurring_next_dates(next_dates)
             
             return {
                 "processed": processed_count,
@@ -128,20 +125,14 @@ class RecurringService:
             return current_date + timedelta(weeks=1)
         elif frequency == FrequencyType.MONTHLY:
             # Move to same day next month (handling month length differences)
-            year = current_date.year + (current_date.month // 12)
-            month = (current_date.month % 12) + 1
-            day = min(current_date.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])
-            return current_date.replace(year=year, month=month, day=day)
+            return _add_months(current_date, 1)
         elif frequency == FrequencyType.QUARTERLY:
             # Move to same day 3 months later
-            year = current_date.year + ((current_date.month + 3) // 12)
-            month = ((current_date.month + 3) % 12) or 12
-            day = min(current_date.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month-1])
-            return current_date.replace(year=year, month=month, day=day)
+            return _add_months(current_date, 3)
         elif frequency == FrequencyType.YEARLY:
             # Move to same date next year (handling leap years)
             year = current_date.year + 1
-            if current_date.month == 2 and current_date.day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+            if current_date.month == 2 and current_date.day == 29 and not _is_leap(year):
                 # Handle Feb 29 in leap years
                 return current_date.replace(year=year, month=3, day=1)
             else:
@@ -1,17 +1,97 @@
+import copy
+import heapq
+import json
+import unicodedata
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+from operator import itemgetter
 from typing import Dict, Any, List, Optional
 import pandas as pd
 
-from data.supabase_client import SupabaseClient
+from data.supabase_client import get_supabase_client
 from core.financial_analyzer import FinancialAnalyzer
-from core.ai_engine import AIEngine
+from core.ai_engine import get_ai_engine
 from config.logging import logger
+from utils.cache_utils import TTLCache
+
+def _alias_key(name: str) -> str:
+    """Lookup key for a report type alias: NFC-normalized and casefolded, so
+    accented aliases match however the accents were encoded"""
+    return unicodedata.normalize('NFC', name).casefold()
+
+# Report type synonyms (by _alias_key) mapped to the canonical report type, built once
+REPORT_TYPE_ALIASES = {
+    _alias_key(alias): report_type
+    for report_type, aliases in {
+        'summary': ('summary', 'resumen', 'overview'),
+        'cashflow': ('cashflow', 'cash', 'flujo', 'flujo_de_caja', 'cash_flow'),
+        'category': ('category', 'categorías', 'categorias', 'categories'),
+        'runway': ('runway', 'burn', 'quema', 'duracion'),
+        'comparison': ('comparison', 'compare', 'comparacion', 'comparación', 'monthly'),
+        'expenses': ('expenses', 'expense', 'gastos', 'gasto', 'spending', 'costs', 'top_expenses'),
+    }.items()
+    for alias in aliases
+}
+
+# Report fields that add nothing to the AI summary
+_SUMMARY_EXCLUDED_FIELDS = ('generated_at', 'analysis_date', 'parameters')
+
+# Items of each list field sent to the AI summary: latest months, largest categories
+_SUMMARY_MONTHS = 6
+_SUMMARY_CATEGORIES = 5
+
+def _summary_payload(report_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact projection of a report for the AI summary prompt
+    
+    Keeps the aggregates, only the latest months of monthly_data and the
+    largest categories (lists arrive sorted by amount).
+    """
+    payload = {}
+    for key, value in report_data.items():
+        if key in _SUMMARY_EXCLUDED_FIELDS:
+            continue
+        if key == 'monthly_data':
+            value = value[-_SUMMARY_MONTHS:]
+        elif isinstance(value, list) and key.endswith('categories'):
+            value = value[:_SUMMARY_CATEGORIES]
+        payload[key] = value
+    return payload
 
 class ReportService:
+    # Generated reports by arguments, shared by every instance
+    _report_cache = TTLCache(maxsize=32, ttl=300)
+    
     def __init__(self):
-        self.supabase = SupabaseClient()
+        self.supabase = get_supabase_client()
         self.financial_analyzer = FinancialAnalyzer()
-        self.ai_engine = AIEngine()
+        self.ai_engine = get_ai_engine()
+        
+        # Report builders by canonical report type, all called with
+        # (period_start, period_end, parameters)
+        self._report_builders = {
+            'summary': lambda start, end, parameters: self._generate_summary_report(start, end),
+            'cashflow': lambda start, end, parameters: self._generate_cashflow_report(start, end),
+            'category': lambda start, end, parameters: self.financial_analyzer.category_analysis(
+                period_start=start,
+                period_end=end,
+                transaction_type=parameters.get('transaction_type', 'expense')
+            ),
+            # Use the specialized top expenses function
+            'expenses': lambda start, end, parameters: self.financial_analyzer.get_top_expenses(
+                period_start=start,
+                period_end=end,
+                limit=parameters.get('limit', 5)
+            ),
+            'runway': lambda start, end, parameters: self.financial_analyzer.calculate_runway(
+                months_back=parameters.get('months_back', 3),
+                cash_balance=parameters.get('cash_balance', None)
+            ),
+            'comparison': lambda start, end, parameters: self.financial_analyzer.monthly_comparison(
+                months_back=parameters.get('months_back', 12),
+                include_current_month=parameters.get('include_current_month', True)
+            ),
+        }
     
     def generate_report(self, report_type: str, 
                        period_start: Optional[datetime] = None,
@@ -20,6 +100,9 @@ class ReportService:
         """
         Generate a financial report
         
+        Identical calls within five minutes are answered from a report cache,
+        which is cleared whenever transactions are written.
+        
         Args:
             report_type: Type of report to generate
                 - 'summary': Basic financial summary
@@ -36,6 +119,33 @@ class ReportService:
         Returns:
             Dictionary with report data
         """
+        cache_key = (
+            report_type,
+            period_start.isoformat() if period_start else None,
+            period_end.isoformat() if period_end else None,
+            json.dumps(parameters or {}, sort_keys=True, default=str)
+        )
+        cached = self._report_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Report '{report_type}' served from cache")
+            return copy.deepcopy(cached)
+        
+        report_data = self._generate_report(report_type, period_start, period_end, parameters)
+        # Reports that failed are not cached: the error may be transient
+        if 'error' not in report_data:
+            self._report_cache.set(cache_key, copy.deepcopy(report_data))
+        return report_data
+    
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Drop cached reports (call after writing transactions)"""
+        cls._report_cache.invalidate()
+    
+    def _generate_report(self, report_type: str,
+                         period_start: Optional[datetime],
+                         period_end: Optional[datetime],
+                         parameters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Uncached body of generate_report"""
         try:
             # Set default period if not provided
             if period_end is None:
@@ -48,59 +158,13 @@ class ReportService:
             if parameters is None:
                 parameters = {}
             
-            report_data = {}
-            
             # Normalize report_type to handle case variations and synonyms
-            report_type_lower = report_type.lower()
-            
-            # Map similar terms to standard report types
-            if report_type_lower in ['summary', 'resumen', 'overview']:
-                report_type = 'summary'
-            elif report_type_lower in ['cashflow', 'cash', 'flujo', 'flujo_de_caja', 'cash_flow']:
-                report_type = 'cashflow'
-            elif report_type_lower in ['category', 'categorías', 'categorias', 'categories']:
-                report_type = 'category'
-            elif report_type_lower in ['runway', 'burn', 'quema', 'duracion']:
-                report_type = 'runway'
-            elif report_type_lower in ['comparison', 'compare', 'comparacion', 'comparación', 'monthly']:
-                report_type = 'comparison'
-            elif report_type_lower in ['expenses', 'expense', 'gastos', 'gasto', 'spending', 'costs', 'top_expenses']:
-                report_type = 'expenses'
+            report_type = REPORT_TYPE_ALIASES.get(_alias_key(report_type), report_type)
             
             # Generate appropriate report based on normalized type
-            if report_type == 'summary':
-                report_data = self._generate_summary_report(period_start, period_end)
-            elif report_type == 'cashflow':
-                report_data = self._generate_cashflow_report(period_start, period_end)
-            elif report_type == 'category':
-                transaction_type = parameters.get('transaction_type', 'expense')
-                report_data = self.financial_analyzer.category_analysis(
-                    period_start=period_start,
-                    period_end=period_end,
-                    transaction_type=transaction_type
-                )
-            elif report_type == 'expenses':
-                # Use the specialized top expenses function
-                limit = parameters.get('limit', 5)
-                report_data = self.financial_analyzer.get_top_expenses(
-                    period_start=period_start,
-                    period_end=period_end,
-                    limit=limit
-                )
-            elif report_type == 'runway':
-                months_back = parameters.get('months_back', 3)
-                cash_balance = parameters.get('cash_balance', None)
-                report_data = self.financial_analyzer.calculate_runway(
-                    months_back=months_back,
-                    cash_balance=cash_balance
-                )
-            elif report_type == 'comparison':
-                months_back = parameters.get('months_back', 12)
-                include_current = parameters.get('include_current_month', True)
-                report_data = self.financial_analyzer.monthly_comparison(
-                    months_back=months_back,
-                    include_current_month=include_current
-                )
+            builder = self._report_builders.get(report_type)
+            if builder is not None:
+                report_data = builder(period_start, period_end, parameters)
             else:
                 # Fallback to summary report with warning
                 logger.warning(f"Unknown report type '{report_type}', defaulting to summary")
@@ -132,51 +196,49 @@ class ReportService:
     def _generate_summary_report(self, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
         """Generate a basic financial summary report"""
         try:
-            # Get transactions for the period
-            transactions = self.supabase.list_transactions(
-                limit=10000,
-                date_range=[period_start.isoformat(), period_end.isoformat()]
-            )
+            # Totals and counts per (type, category), aggregated in the database
+            totals = self.supabase.transaction_totals(period_start, period_end)
             
-            if not transactions:
+            if not totals:
                 return {
                     'error': 'No transaction data available for the selected period',
                     'message': 'No hay datos de transacciones disponibles para el período seleccionado.',
                     'suggestion': 'Intenta agregar algunas transacciones primero o selecciona un período diferente.'
                 }
             
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame([t.model_dump() for t in transactions])
+            # One row per (type, category): few enough to aggregate in plain Python
+            type_totals = defaultdict(float)
+            type_counts = Counter()
+            category_totals = defaultdict(dict)
+            for row in totals:
+                amount = float(row['total'])
+                type_totals[row['type']] += amount
+                type_counts[row['type']] += int(row['n'])
+                category_totals[row['type']][row['category']] = amount
             
             # Calculate key metrics
-            income = df[df['type'] == 'income']['amount'].sum()
-            expenses = df[df['type'] == 'expense']['amount'].sum()
+            income = type_totals['income']
+            expenses = type_totals['expense']
             net = income - expenses
             
             # Count transactions
-            num_income = len(df[df['type'] == 'income'])
-            num_expenses = len(df[df['type'] == 'expense'])
-            
-            # Top categories
-            top_income_categories = df[df['type'] == 'income'].groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
-            top_expense_categories = df[df['type'] == 'expense'].groupby('category')['amount'].sum().sort_values(ascending=False).head(3)
+            num_income = type_counts['income']
+            num_expenses = type_counts['expense']
             
-            # Format top categories
-            top_income = []
-            for category, amount in top_income_categories.items():
-                top_income.append({
-                    'category': category,
-                    'amount': float(amount),
-                    'percentage': float(amount / income * 100) if income > 0 else 0
-                })
+            # Top 3 categories of a type, with their share of the type total
+            def top_categories(transaction_type: str, type_total: float) -> List[Dict[str, Any]]:
+                top = heapq.nlargest(3, category_totals[transaction_type].items(), key=itemgetter(1))
+                return [
+                    {
+                        'category': category,
+                        'amount': amount,
+                        'percentage': amount / type_total * 100 if type_total > 0 else 0
+                    }
+                    for category, amount in top
+                ]
             
-            top_expenses = []
-            for category, amount in top_expense_categories.items():
-                top_expenses.append({
-                    'category': category,
-                    'amount': float(amount),
-                    'percentage': float(amount / expenses * 100) if expenses > 0 else 0
-                })
+            top_income = top_categories('income', income)
+            top_expenses = top_categories('expense', expenses)
             
             # Prepare report data
             report_data = {
@@ -198,54 +260,50 @@ class ReportService:
     def _generate_cashflow_report(self, period_start: datetime, period_end: datetime) -> Dict[str, Any]:
         """Generate a cash flow report"""
         try:
-            # Get transactions for the period
-            transactions = self.supabase.list_transactions(
-                limit=10000,
-                date_range=[period_start.isoformat(), period_end.isoformat()]
-            )
+            # Totals per (month, type), aggregated in the database
+            totals = self.supabase.monthly_transaction_totals(period_start, period_end)
             
-            if not transactions:
+            if not totals:
                 return {
                     'error': 'No transaction data available for the selected period',
                     'message': 'No hay datos de transacciones disponibles para el período seleccionado.',
                     'suggestion': 'Intenta agregar algunas transacciones primero o selecciona un período diferente.'
                 }
             
-            # Convert to DataFrame for easier analysis
-            df = pd.DataFrame([t.model_dump() for t in transactions])
-            df['date'] = pd.to_datetime(df['date'])
+            # Income and expenses per month ('YYYY-MM' keys sort chronologically)
+            monthly = pd.DataFrame(totals).astype({'total': 'float64'}).pivot_table(
+                index='month', columns='type', values='total', aggfunc='sum', fill_value=0.0
+            ).reindex(columns=['income', 'expense'], fill_value=0.0).astype('float64').sort_index()
+            net = monthly['income'] - monthly['expense']
+            balance = net.cumsum()
             
-            # Group by month and calculate cash flow
-            df['month'] = df['date'].dt.to_period('M')
-            
-            monthly_data = []
-            running_balance = 0
-            
-            for month, month_group in df.groupby('month'):
-                income = month_group[month_group['type'] == 'income']['amount'].sum()
-                expenses = month_group[month_group['type'] == 'expense']['amount'].sum()
-                net = income - expenses
-                running_balance += net
-                
-                monthly_data.append({
-                    'month': month.strftime('%Y-%m'),
-                    'income': float(income),
-                    'expenses': float(expenses),
-                    'net': float(net),
-                    'balance': float(running_balance)
-                })
+            monthly_data = [
+                {
+                    'month': month,
+                    'income': income,
+                    'expenses': expenses,
+                    'net': month_net,
+                    'balance': month_balance
+                }
+                for month, income, expenses, month_net, month_balance in zip(
+                    monthly.index.tolist(),
+                    monthly['income'].tolist(),
+                    monthly['expense'].tolist(),
+                    net.tolist(),
+                    balance.tolist()
+                )
+            ]
             
             # Calculate totals
-            total_income = df[df['type'] == 'income']['amount'].sum()
-            total_expenses = df[df['type'] == 'expense']['amount'].sum()
-            total_net = total_income - total_expenses
+            total_income = float(monthly['income'].sum())
+            total_expenses = float(monthly['expense'].sum())
             
             # Prepare report data
             report_data = {
-                'total_income': float(total_income),
-                'total_expenses': float(total_expenses),
-                'total_net': float(total_net),
-                'final_balance': float(running_balance),
+                'total_income': total_income,
+                'total_expenses': total_expenses,
+                'total_net': total_income - total_expenses,
+                'final_balance': float(balance.iloc[-1]),
                 'monthly_data': monthly_data
             }
             
@@ -264,12 +322,15 @@ class ReportService:
             if 'error' in report_data:
                 return f"Error generating report: {report_data['error']}"
             
+            # Only the relevant part of the report, as compact JSON
+            payload = json.dumps(_summary_payload(report_data), default=str, separators=(',', ':'))
+            
             prompt = f"""
             Please summarize the following {report_type} financial report in a concise, 
             informative way. Focus on the most important insights and trends.
             
             Report data:
-            {report_data}
+            {payload}
             
             Provide a 3-5 sentence summary with the key insights from this data.
             """
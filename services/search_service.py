@@ -1,12 +1,18 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
-from core.search_engine import SearchEngine
-from core.ai_engine import AIEngine
+from core.search_engine import get_search_engine
+from core.ai_engine import get_ai_engine
 from config.logging import logger
 
+# Document searches run here, alongside the transaction search of the same request
+_search_pool = ThreadPoolExecutor(max_workers=4)
+
 class SearchService:
     def __init__(self):
-        self.search_engine = SearchEngine()
-        self.ai_engine = AIEngine()
+        # Only type, amount, currency, description, category and date are shown: metadata suffices
+        self.search_engine = get_search_engine(hydrate="lazy")
+        self.ai_engine = get_ai_engine()
     
     def search(self, query: str, search_type: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
         """
@@ -49,14 +55,17 @@ class SearchService:
             if 'filters' in parameters:
                 filters = parameters['filters']
             
-            # Perform search based on type
+            # Perform search based on type (both searches at once for 'all')
+            documents_future = None
+            if search_type in ['documents', 'all']:
+                documents_future = _search_pool.submit(self.search_engine.search_documents, query, limit)
+            
             if search_type in ['transactions', 'all']:
                 transactions = self.search_engine.search_transactions(query, limit, filters)
                 results['transactions'] = transactions
             
-            if search_type in ['documents', 'all']:
-                documents = self.search_engine.search_documents(query, limit)
-                results['documents'] = documents
+            if documents_future is not None:
+                results['documents'] = documents_future.result()
             
             # Generate a human-friendly response
             explanation = self._generate_search_explanation(results)
@@ -109,8 +118,9 @@ class SearchService:
                 else:
                     explanation.append(f"Found {len(transactions)} transactions.")
                     # Summarize transaction types
-                    expenses = sum(1 for t in transactions if t['type'] == 'expense')
-                    incomes = sum(1 for t in transactions if t['type'] == 'income')
+                    type_counts = Counter(t['type'] for t in transactions)
+                    expenses = type_counts.get('expense', 0)
+                    incomes = type_counts.get('income', 0)
                     
                     if expenses > 0:
                         explanation.append(f"- {expenses} {'expense' if expenses == 1 else 'expenses'}")
@@ -124,10 +134,7 @@ class SearchService:
                 else:
                     explanation.append(f"Found {len(documents)} documents.")
                     # Summarize document types
-                    doc_types = {}
-                    for d in documents:
-                        doc_type = d['type']
-                        doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
+                    doc_types = Counter(d['type'] for d in documents)
                     
                     for doc_type, count in doc_types.items():
                         explanation.append(f"- {count} {doc_type}{'s' if count > 1 else ''}")
@@ -1,20 +1,41 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Union
 from uuid import UUID
 import json
 
-from data.models import Transaction, TransactionCreate, TransactionType
-from data.supabase_client import SupabaseClient
-from data.pinecone_client import PineconeClient
-from core.ai_engine import AIEngine
-from utils.embedding_utils import generate_embedding
+from data.models import Transaction, TransactionCreate, TransactionType, parse_transactions
+from data.supabase_client import get_supabase_client
+from data.pinecone_client import get_pinecone_client
+from core.ai_engine import get_ai_engine
+from core.search_engine import SearchEngine, get_search_engine
+from services.report_service import ReportService
+from utils.embedding_utils import generate_embedding_array, generate_batch_embeddings_array
 from config.logging import logger
 
+# Supabase and Pinecone writes of a single update or delete run here concurrently
+_io_pool = ThreadPoolExecutor(max_workers=4)
+
+def _transaction_metadata(transaction: Union[Transaction, TransactionCreate]) -> Dict[str, Any]:
+    """Pinecone metadata stored with a transaction's vector"""
+    date_value = transaction.date
+    return {
+        "type": transaction.type.value,
+        "amount": float(transaction.amount),
+        "currency": transaction.currency,
+        "category": transaction.category,
+        "date": date_value.isoformat() if isinstance(date_value, datetime) else str(date_value),
+        "description": transaction.description,
+        "reference_type": "transaction"
+    }
+
 class TransactionService:
     def __init__(self):
-        self.supabase = SupabaseClient()
-        self.pinecone = PineconeClient()
-        self.ai_engine = AIEngine()
+        self.supabase = get_supabase_client()
+        self.pinecone = get_pinecone_client()
+        self.ai_engine = get_ai_engine()
+        self.search_engine = get_search_engine()
     
     def process_natural_language(self, text: str) -> Dict[str, Any]:
         """Process natural language input to extract transaction data"""
@@ -87,55 +108,71 @@ class TransactionService:
                 "error": str(e)
             }
     
-    def create(self, transaction_data: Dict[str, Any]) -> Transaction:
-        """Create a new transaction"""
-        try:
-            # Prepare transaction data
-            create_data = TransactionCreate(**transaction_data)
+    def create(self, transaction_data: Union[Dict[str, Any], TransactionCreate]) -> Transaction:
+        """Create a new transaction (from a dict, or an already validated TransactionCreate)"""
+        return self.create_many([transaction_data])[0]
+    
+    def import_json(self, payload: Union[str, bytes]) -> List[Transaction]:
+        """
+        Create the transactions in a JSON array (file upload / bulk import)
+        
+        The whole payload is validated with parse_transactions before anything
+        is written, so an invalid element aborts the import.
+        """
+        return self.create_many(parse_transactions(payload))
+    
+    def create_many(self, transactions: List[Union[Dict[str, Any], TransactionCreate]]) -> List[Transaction]:
+        """
+        Create several transactions with batched writes
+        
+        Embeddings are generated in one batch and stored with the rows in the
+        same insert; the vectors go to Pinecone in batched upserts.
+        
+        Args:
+            transactions: Dicts or already validated TransactionCreate models
             
-            # Create transaction in Supabase
-            created_transaction = self.supabase.create_transaction(create_data)
+        Returns:
+            The created transactions, in the same order
+        """
+        try:
+            # Prepare transaction data (models built by the caller are not validated again)
+            create_data = [
+                transaction if isinstance(transaction, TransactionCreate)
+                else TransactionCreate.model_validate(transaction)
+                for transaction in transactions
+            ]
+            if not create_data:
+                return []
             
-            # Generate embedding for semantic search
-            description = transaction_data["description"]
-            category = transaction_data["category"]
-            search_text = f"{description} {category} {transaction_data['type']}"
+            # Generate embeddings for semantic search (float32 rows, converted
+            # only when each client encodes its request)
+            embeddings = generate_batch_embeddings_array([
+                f"{t.description} {t.category} {t.type.value}" for t in create_data
+            ])
             
-            embedding = generate_embedding(search_text)
+            # Create transactions in Supabase, each row with its embedding
+            created_transactions = self.supabase.create_transactions_bulk([
+                {**t.model_dump(mode="json", exclude_unset=True), "embedding": embedding}
+                for t, embedding in zip(create_data, embeddings)
+            ])
             
-            # Store embedding in Pinecone
-            # Convertir fecha a string si es un objeto datetime
-            date_value = transaction_data["date"]
-            if isinstance(date_value, datetime):
-                date_str = date_value.isoformat()
-            else:
-                date_str = str(date_value)
-                
-            metadata = {
-                "type": transaction_data["type"],
-                "amount": float(transaction_data["amount"]),
-                "currency": transaction_data["currency"],
-                "category": transaction_data["category"],
-                "date": date_str,
-                "description": transaction_data["description"],
-                "reference_type": "transaction"
-            }
+            # Store embeddings in Pinecone, grouped by namespace
+            vectors_by_namespace: Dict[Optional[str], List[tuple]] = {}
+            for created, t, embedding in zip(created_transactions, create_data, embeddings):
+                namespace = self.pinecone.transaction_namespace(t.type.value)
+                vectors_by_namespace.setdefault(namespace, []).append(
+                    (created.id, embedding, _transaction_metadata(t))
+                )
             
-            self.pinecone.upsert_vector(
-                id=created_transaction.id,
-                vector=embedding,
-                metadata=metadata
-            )
+            for namespace, vectors in vectors_by_namespace.items():
+                self.pinecone.upsert_vectors(vectors, namespace=namespace)
             
-            # Update transaction with embedding in Supabase
-            self.supabase.update_transaction(
-                created_transaction.id, 
-                {"embedding": embedding}
-            )
+            SearchEngine.invalidate_cache()
+            ReportService.invalidate_cache()
             
-            return created_transaction
+            return created_transactions
         except Exception as e:
-            logger.error(f"Error creating transaction: {e}")
+            logger.error(f"Error creating transactions: {e}")
             raise
     
     def get(self, transaction_id: Union[str, UUID]) -> Optional[Transaction]:
@@ -148,40 +185,38 @@ class TransactionService:
             # Update transaction in Supabase
             updated_transaction = self.supabase.update_transaction(transaction_id, data)
             
-            # If description or category changed, update embedding
-            if "description" in data or "category" in data:
-                # Get full transaction to create embedding
-                transaction = self.supabase.get_transaction(transaction_id)
+            # If description, category or type changed, update embedding
+            if "description" in data or "category" in data or "type" in data:
+                # The update returns the full row, so there is no need to fetch it again
+                transaction = updated_transaction
                 
                 search_text = f"{transaction.description} {transaction.category} {transaction.type.value}"
-                embedding = generate_embedding(search_text)
+                embedding = generate_embedding_array(search_text)
                 
-                # Update embedding in Supabase
-                self.supabase.update_transaction(transaction_id, {"embedding": embedding})
-                
-                # Convert date to string if it's a datetime object
-                date_value = transaction.date
-                if isinstance(date_value, datetime):
-                    date_str = date_value.isoformat()
-                else:
-                    date_str = str(date_value)
+                # Update embedding in Supabase while the Pinecone writes run
+                embedding_saved = _io_pool.submit(
+                    self.supabase.update_transaction, transaction_id, {"embedding": embedding}
+                )
                 
                 # Update embedding in Pinecone
-                metadata = {
-                    "type": transaction.type.value,
-                    "amount": float(transaction.amount),
-                    "currency": transaction.currency,
-                    "category": transaction.category,
-                    "date": date_str,
-                    "description": transaction.description,
-                    "reference_type": "transaction"
-                }
-                
+                namespace = self.pinecone.transaction_namespace(transaction.type.value)
                 self.pinecone.upsert_vector(
                     id=transaction_id,
                     vector=embedding,
-                    metadata=metadata
+                    metadata=_transaction_metadata(transaction),
+                    namespace=namespace
                 )
+                
+                # With per-type namespaces, a type change moves the vector
+                if namespace and "type" in data:
+                    for other_type in TransactionType:
+                        if other_type.value != namespace:
+                            self.pinecone.delete_vector(transaction_id, namespace=other_type.value)
+                
+                embedding_saved.result()
+            
+            SearchEngine.invalidate_cache()
+            ReportService.invalidate_cache()
             
             return updated_transaction
         except Exception as e:
@@ -191,11 +226,25 @@ class TransactionService:
     def delete(self, transaction_id: Union[str, UUID]) -> bool:
         """Delete a transaction"""
         try:
+            # Delete from Pinecone (from every type namespace if they are used),
+            # concurrently with the Supabase delete
+            if self.pinecone.type_namespaces:
+                namespaces = [transaction_type.value for transaction_type in TransactionType]
+            else:
+                namespaces = [None]
+            vector_deletes = [
+                _io_pool.submit(self.pinecone.delete_vector, transaction_id, namespace=namespace)
+                for namespace in namespaces
+            ]
+            
             # Delete from Supabase
             result = self.supabase.delete_transaction(transaction_id)
             
-            # Delete from Pinecone
-            self.pinecone.delete_vector(transaction_id)
+            for vector_delete in vector_deletes:
+                vector_delete.result()
+            
+            SearchEngine.invalidate_cache()
+            ReportService.invalidate_cache()
             
             return result
         except Exception as e:
@@ -210,10 +259,12 @@ class TransactionService:
         """Search for transactions similar to the query text"""
         try:
             # Use the search engine to search for transactions
-            from core.search_engine import SearchEngine
-            search_engine = SearchEngine()
-            
-            return search_engine.search_transactions(query, limit, filters)
+            return self.search_engine.search_transactions(query, limit, filters)
         except Exception as e:
             logger.error(f"Error searching transactions: {e}")
-            return []
\ No newline at end of file
+            return []
+
+@functools.lru_cache(maxsize=1)
+def get_transaction_service() -> TransactionService:
+    """Process-wide TransactionService, so its clients and engines are built once"""
+    return TransactionService()
@@ -5,6 +5,7 @@ setup(
     version="0.1.0",
     packages=find_packages(),
     include_package_data=True,
+    python_requires=">=3.11",
     install_requires=[
         "python-dotenv>=1.0.0",
         "pydantic>=2.0.0",
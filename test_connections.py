@@ -12,7 +12,7 @@ load_dotenv()
 
 # Importar nuestros clientes
 from data.supabase_client import SupabaseClient
-from data.pinecone_client import PineconeClient
+from data.pinecone_client import get_pinecone_client
 
 def test_supabase_connection():
     """Prueba la conexión con Supabase"""
@@ -34,8 +34,8 @@ def test_pinecone_connection():
     """Prueba la conexión con Pinecone"""
     print("\n--- Probando conexión con Pinecone ---")
     try:
-        pinecone = PineconeClient()
-        pinecone.index_name = "finance-ai-index"  # Asegurar que el nombre es correcto
+        # Cliente compartido: las operaciones con vectores reutilizan su conexión al índice
+        pinecone = get_pinecone_client()
         
         # Modificar setup_index para usar la región correcta
         index = pinecone.setup_index()
@@ -79,8 +79,7 @@ def test_pinecone_vector_operations(embedding):
             print("❌ No se puede probar sin un embedding válido.")
             return False
         
-        pinecone = PineconeClient()
-        index = pinecone.get_index()
+        pinecone = get_pinecone_client()
         
         # Crear un ID único para prueba
         test_id = str(uuid.uuid4())
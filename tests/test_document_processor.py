@@ -0,0 +1,38 @@
+import pytest
+
+from core.document_processor import DocumentProcessor
+
+
+@pytest.fixture
+def processor():
+    # The regex pass never calls the AI engine
+    return DocumentProcessor(ai_engine=object())
+
+
+def _invoice(total_line: str) -> str:
+    return f"Invoice No. FV-1024\nFrom: Servicios Andinos SAS\nDate: 2025-03-14\n{total_line}\n"
+
+
+def test_cop_total_with_dot_thousands_separator(processor):
+    data = processor._regex_extract(_invoice("TOTAL A PAGAR: $ 150.000 COP"), "invoice")
+    assert data["total_amount"] == 150000.0
+    assert data["currency"] == "COP"
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1.500", 1500.0),
+    ("1.234.567", 1234567.0),
+    ("1,500", 1500.0),
+    ("45.20", 45.2),
+    ("45,5", 45.5),
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+])
+def test_parse_amount_separators(processor, value, expected):
+    assert processor._parse_amount(value) == expected
+
+
+@pytest.mark.parametrize("value, currency", [("12.3456", "USD"), ("150.00", "COP")])
+def test_ambiguous_amount_is_left_to_the_llm(processor, value, currency):
+    assert processor._parse_amount(value, currency) is None
+    assert processor._regex_extract(_invoice(f"Total: {value} {currency}"), "invoice") is None
@@ -0,0 +1,13 @@
+import numpy as np
+
+from utils.embedding_utils import generate_embedding
+
+
+def test_generate_embedding_is_deterministic():
+    assert generate_embedding("x") == generate_embedding("x")
+
+
+def test_generate_embedding_differs_per_text_and_is_normalized():
+    a, b = np.asarray(generate_embedding("x")), np.asarray(generate_embedding("y"))
+    assert not np.array_equal(a, b)
+    assert np.isclose(np.linalg.norm(a), 1.0, atol=1e-5)
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pytest
+
+from data.models import FrequencyType
+from services.recurring_service import RecurringService
+
+
+@pytest.fixture
+def service():
+    # _calculate_next_date does not touch Supabase, so skip __init__
+    return RecurringService.__new__(RecurringService)
+
+
+def test_quarterly_september_stays_in_same_year(service):
+    assert service._calculate_next_date(datetime(2025, 9, 15), FrequencyType.QUARTERLY) == datetime(2025, 12, 15)
+
+
+def test_quarterly_november_rolls_into_next_year(service):
+    assert service._calculate_next_date(datetime(2025, 11, 15), FrequencyType.QUARTERLY) == datetime(2026, 2, 15)
+    assert service._calculate_next_date(datetime(2025, 11, 30), FrequencyType.QUARTERLY) == datetime(2026, 2, 28)
+
+
+@pytest.mark.parametrize("year, expected_day", [(2025, 28), (2024, 29)])
+def test_monthly_january_31_clamps_to_end_of_february(service, year, expected_day):
+    assert service._calculate_next_date(datetime(year, 1, 31), FrequencyType.MONTHLY) == datetime(year, 2, expected_day)
+
+
+def test_yearly_february_29(service):
+    assert service._calculate_next_date(datetime(2024, 2, 29), FrequencyType.YEARLY) == datetime(2025, 3, 1)
+    assert service._calculate_next_date(datetime(2027, 2, 28), FrequencyType.YEARLY) == datetime(2028, 2, 28)
@@ -1,75 +1,301 @@
 import os
-from typing import List, Optional
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 import numpy as np
 import hashlib
 from config.settings import settings
 from config.logging import logger
+from utils.cache_utils import TTLCache
 
-# Inicializar cliente de Anthropic (solo para generación de texto, no para embeddings)
-from anthropic import Anthropic
-anthropic = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Numba es opcional: si está instalado, la similitud usa un kernel compilado
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-def generate_embedding(text: str) -> List[float]:
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _cosine_nb(a, b):
+        dot = 0.0
+        aa = 0.0
+        bb = 0.0
+        for i in range(a.shape[0]):
+            x = a[i]
+            y = b[i]
+            dot += x * y
+            aa += x * x
+            bb += y * y
+        if aa == 0.0 or bb == 0.0:
+            return 0.0
+        return dot / math.sqrt(aa * bb)
+else:
+    _cosine_nb = None
+
+# Un generador por hilo, re-sembrado para cada texto: sin tocar el estado global
+# de NumPy (seguro entre hilos) y sin el coste de crear un RandomState por llamada
+_rng_local = threading.local()
+
+def _thread_rng() -> np.random.RandomState:
+    """This thread's RandomState"""
+    rng = getattr(_rng_local, "rng", None)
+    if rng is None:
+        rng = _rng_local.rng = np.random.RandomState()
+    return rng
+
+# Los lotes grandes se rellenan por tramos en paralelo: RandomState libera el GIL
+# mientras genera, y cada hilo usa su propio generador
+_FILL_CHUNK_ROWS = 256
+_FILL_WORKERS = min(8, os.cpu_count() or 1)
+_fill_pool = ThreadPoolExecutor(max_workers=_FILL_WORKERS)
+
+def _fill_rows(matrix: np.ndarray, seeds: List[int]) -> None:
+    """Fill each row of matrix with the normal draws of its seed"""
+    rng = _thread_rng()
+    for row, seed in zip(matrix, seeds):
+        # Misma secuencia que np.random.seed + randn, para no invalidar los vectores guardados
+        rng.seed(seed)
+        row[:] = rng.standard_normal(settings.VECTOR_DIMENSION)
+
+def _compute_embeddings(seeds: List[int]) -> np.ndarray:
     """
-    Generate embedding vector for text using a deterministic hash-based approach
-    until we can use a proper embedding API.
+    Deterministic unit vectors, one row per seed derived from a text hash
+    
+    Every row is drawn into one (n, dim) matrix and all rows are normalized
+    in a single vectorized step. Each row depends only on its seed, so large
+    batches are filled in chunks on several threads with the same result.
+    """
+    matrix = np.empty((len(seeds), settings.VECTOR_DIMENSION))
+    if len(seeds) <= _FILL_CHUNK_ROWS or _FILL_WORKERS == 1:
+        _fill_rows(matrix, seeds)
+    else:
+        chunks = [
+            _fill_pool.submit(_fill_rows, matrix[i:i + _FILL_CHUNK_ROWS], seeds[i:i + _FILL_CHUNK_ROWS])
+            for i in range(0, len(seeds), _FILL_CHUNK_ROWS)
+        ]
+        for chunk in chunks:
+            chunk.result()
+    
+    # Normalizar las filas para similitud de coseno (las de norma cero se quedan igual):
+    # suma de cuadrados por fila sin arrays temporales y un único escalado in situ
+    squares = np.einsum('ij,ij->i', matrix, matrix)
+    inverse_norms = np.divide(1.0, np.sqrt(squares), out=np.ones_like(squares), where=squares > 0)
+    matrix *= inverse_norms[:, None]
+    # Solo lectura: las filas se guardan tal cual en la caché
+    matrix.flags.writeable = False
+    return matrix
+
+def _seed(digest: bytes) -> int:
+    """RNG seed for a text, from the MD5 digest of the text"""
+    return int.from_bytes(digest, 'big') % 10000000
+
+# Embeddings por hash MD5 del texto (16 bytes por clave): el resultado es
+# determinista, así que un texto repetido no se vuelve a calcular. Se guardan
+# como filas ndarray de solo lectura (12 KB frente a ~50 KB de una tupla de floats)
+_embedding_cache = TTLCache(maxsize=4096)
+
+# Vector de texto vacío (y de error), compartido y de solo lectura como las filas de la caché
+_ZERO_ROW = np.zeros(settings.VECTOR_DIMENSION)
+_ZERO_ROW.flags.writeable = False
+
+def _embedding_row(text: str) -> np.ndarray:
+    """
+    Embedding of a text as a read-only float64 row, computed once per text
+    (cached by the MD5 of the text)
     """
     try:
         # Si el texto está vacío, devolver un vector de ceros
-        if not text or text.strip() == "":
+        if not text or not text.strip():
             logger.warning("Attempted to generate embedding for empty text")
-            return np.zeros(settings.VECTOR_DIMENSION).tolist()
-        
-        logger.info(f"Generando embedding para texto: '{text[:50]}...'")
+            return _ZERO_ROW
         
         # Generar un hash de texto para crear un vector determinista
         # Esto asegura que el mismo texto siempre genere el mismo vector
-        seed = int(hashlib.md5(text.encode('utf-8')).hexdigest(), 16) % 10000000
-        np.random.seed(seed)
+        digest = hashlib.md5(text.encode('utf-8')).digest()
+        cached = _embedding_cache.get(digest)
+        if cached is None:
+            logger.debug("Generando embedding para texto: '%s...'", text[:50])
+            cached = _compute_embeddings([_seed(digest)])[0]
+            _embedding_cache.set(digest, cached)
         
-        # Generar vector aleatorio pero determinista
-        random_vector = np.random.randn(settings.VECTOR_DIMENSION)
-        
-        # Normalizar el vector para similitud de coseno
-        norm = np.linalg.norm(random_vector)
-        if norm > 0:
-            normalized_vector = random_vector / norm
-        else:
-            normalized_vector = random_vector
-        
-        logger.info("Embedding generado usando método basado en hash")
-        return normalized_vector.tolist()
+        return cached
         
     except Exception as e:
         logger.error(f"Error generando embedding: {e}")
         # Si todo falla, devolver un vector de ceros
-        return np.zeros(settings.VECTOR_DIMENSION).tolist()
+        return _ZERO_ROW
+
+def generate_embedding(text: str) -> List[float]:
+    """
+    Generate embedding vector for text using a deterministic hash-based approach
+    until we can use a proper embedding API.
+    
+    Results are cached by the MD5 of the text, so repeated texts are not recomputed.
+    Callers that pass the vector on to the clients should prefer
+    generate_embedding_array, which creates no Python floats.
+    """
+    return _embedding_row(text).tolist()
+
+def _as_f32(x) -> np.ndarray:
+    """Return x as a C-contiguous float32 array, without copying when it already is one"""
+    if isinstance(x, np.ndarray) and x.dtype == np.float32 and x.flags.c_contiguous:
+        return x
+    return np.ascontiguousarray(x, dtype=np.float32)
 
 def calculate_similarity(embedding1: List[float], embedding2: List[float]) -> float:
     """Calculate cosine similarity between two embeddings"""
+    # Sin datos no hay similitud (evita construir arrays vacíos)
+    if len(embedding1) == 0 or len(embedding2) == 0:
+        return 0.0
+    
     try:
-        # Convertir a arrays de numpy
-        a = np.array(embedding1)
-        b = np.array(embedding2)
+        # Arrays float32 contiguos (sin copiar si ya lo son) para BLAS y el kernel de numba
+        a = _as_f32(embedding1)
+        b = _as_f32(embedding2)
+        if a.ndim != 1 or a.shape != b.shape:
+            raise ValueError(f"Dimensiones incompatibles: {a.shape} y {b.shape}")
+    except (TypeError, ValueError) as e:
+        logger.error("Error calculando similitud: %s", e)
+        return 0.0
+    
+    # Usar el kernel compilado si numba está disponible
+    if _cosine_nb is not None:
+        return float(_cosine_nb(a, b))
+    
+    # Producto de normas al cuadrado con una sola raíz
+    norms_squared = np.vdot(a, a) * np.vdot(b, b)
+    
+    # Comprobar que los vectores no son cero
+    if norms_squared == 0:
+        return 0.0
+    
+    # Calcular similitud del coseno
+    return float(np.dot(a, b) / np.sqrt(norms_squared))
+
+def calculate_similarity_normalized(embedding1: List[float], embedding2: List[float]) -> float:
+    """
+    Cosine similarity between two embeddings that are already L2-normalized
+    (as returned by generate_embedding), which reduces to a dot product
+    """
+    return float(np.dot(_as_f32(embedding1), _as_f32(embedding2)))
+
+def cosine_many(queries, matrix, normalized: bool = True) -> np.ndarray:
+    """
+    Cosine similarity between every query and every row of a matrix
+    
+    Args:
+        queries: Array-like of shape (nq, d)
+        matrix: Array-like of shape (nm, d)
+        normalized: Whether the rows are already L2-normalized
         
-        # Comprobar que los vectores no son cero
-        if np.linalg.norm(a) == 0 or np.linalg.norm(b) == 0:
-            return 0.0
+    Returns:
+        Array of shape (nq, nm) with the similarities
+    """
+    q = np.atleast_2d(_as_f32(queries))
+    m = np.atleast_2d(_as_f32(matrix))
+    
+    if not normalized:
+        # Normalizar filas evitando dividir por cero
+        q_norms = np.linalg.norm(q, axis=1, keepdims=True)
+        m_norms = np.linalg.norm(m, axis=1, keepdims=True)
+        q = np.divide(q, q_norms, out=np.zeros_like(q), where=q_norms > 0)
+        m = np.divide(m, m_norms, out=np.zeros_like(m), where=m_norms > 0)
+    
+    return q @ m.T
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (only those k are sorted)"""
+    size = scores.shape[0]
+    if k < size:
+        idx = np.argpartition(-scores, k)[:k]
+    else:
+        idx = np.arange(size)
+    return idx[np.argsort(-scores[idx])]
+
+def cosine_topk(query, matrix, k: int, normalized: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The k rows of a matrix most similar to a query
+    
+    Scores every row with a single matrix-vector product. Rows returned by
+    generate_embedding are already unit-normalized, so the default skips
+    the norms; don't renormalize them before calling.
+    
+    Args:
+        query: Array-like of shape (d,)
+        matrix: Array-like of shape (n, d), ideally C-contiguous float32
+        k: Number of rows to return
+        normalized: Whether query and rows are already L2-normalized
         
-        # Calcular similitud del coseno
-        similarity = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    Returns:
+        Tuple (indices, scores) of the k best rows, best first
+    """
+    scores = cosine_many(query, matrix, normalized)[0]
+    idx = top_k(scores, k)
+    return idx, scores[idx]
+
+def quantize_int8(vectors) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric int8 quantization with one scale per vector
+    
+    Args:
+        vectors: Array-like of shape (d,) or (n, d)
         
-        return float(similarity)
-    except Exception as e:
-        logger.error(f"Error calculando similitud: {e}")
-        return 0.0
+    Returns:
+        Tuple (codes, scales) with int8 codes of the same shape and float32
+        scales such that codes * scales approximates the input
+    """
+    v = np.asarray(vectors, dtype=np.float32)
+    scales = np.max(np.abs(v), axis=-1, keepdims=True) / 127.0
+    codes = np.divide(v, scales, out=np.zeros_like(v), where=scales > 0)
+    return np.rint(codes).astype(np.int8), np.squeeze(scales, axis=-1)
 
-def generate_batch_embeddings(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for multiple texts"""
-    embeddings = []
+def _embedding_rows(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embedding of each text as a read-only float64 row
     
-    for text in texts:
-        embedding = generate_embedding(text)
-        embeddings.append(embedding)
+    Each distinct text is computed once; the ones not cached are generated
+    together as a single matrix.
+    """
+    embeddings = {}
+    missing = []
+    for text in dict.fromkeys(texts):
+        if not text or not text.strip():
+            embeddings[text] = _embedding_row(text)
+            continue
+        digest = hashlib.md5(text.encode('utf-8')).digest()
+        cached = _embedding_cache.get(digest)
+        if cached is None:
+            missing.append((text, digest))
+        else:
+            embeddings[text] = cached
     
-    return embeddings
\ No newline at end of file
+    if missing:
+        logger.info(f"Generando {len(missing)} embeddings en lote")
+        matrix = _compute_embeddings([_seed(digest) for _, digest in missing])
+        for (text, digest), row in zip(missing, matrix):
+            embeddings[text] = row
+            _embedding_cache.set(digest, row)
+    
+    return [embeddings[text] for text in texts]
+
+def generate_batch_embeddings(texts: List[str]) -> List[List[float]]:
+    """Generate embeddings for multiple texts, as lists of floats"""
+    # Una lista propia por posición, aunque el texto se repita
+    return [row.tolist() for row in _embedding_rows(texts)]
+
+def generate_batch_embeddings_array(texts: List[str]) -> np.ndarray:
+    """
+    Generate embeddings for multiple texts as one (n, dim) float32 array
+    
+    For callers that keep working with the vectors: no Python floats are
+    created; convert rows with .tolist() only where an API needs lists.
+    """
+    rows = _embedding_rows(texts)
+    if not rows:
+        return np.empty((0, settings.VECTOR_DIMENSION), dtype=np.float32)
+    return np.asarray(rows, dtype=np.float32)
+
+def generate_embedding_array(text: str) -> np.ndarray:
+    """generate_embedding as a contiguous float32 array"""
+    return _embedding_row(text).astype(np.float32)